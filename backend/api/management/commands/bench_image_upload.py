@@ -0,0 +1,63 @@
+import base64
+import io
+import os
+import time
+import tracemalloc
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from PIL import Image
+from rest_framework import serializers
+
+from api.v1.serializers import Base64ImageField
+
+
+class InMemoryBase64ImageField(serializers.ImageField):
+    def to_internal_value(self, data):
+        format, imgstr = data.split(";base64,")
+        ext = format.split("/")[-1]
+        data = ContentFile(base64.b64decode(imgstr), name="temp." + ext)
+        return super().to_internal_value(data)
+
+
+class Command(BaseCommand):
+    help = 'compare peak memory of in-memory and chunked base64 image ingest'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[500, 1000, 2000],
+            help='side of the square noise image, px')
+
+    def measure(self, field, data):
+        tracemalloc.start()
+        start = time.perf_counter()
+        image = field.to_internal_value(data)
+        elapsed = (time.perf_counter() - start) * 1e3
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        image.close()
+        return peak / 2 ** 20, elapsed
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"image":>12} {"upload MB":>10} '
+            f'{"in-memory MB":>13} {"chunked MB":>11} '
+            'ms (in-memory / chunked)')
+        for side in options['sizes']:
+            buffer = io.BytesIO()
+            Image.frombytes('RGB', (side, side), os.urandom(side * side * 3)
+                            ).save(buffer, 'PNG', compress_level=0)
+            data = ('data:image/png;base64,'
+                    + base64.b64encode(buffer.getvalue()).decode())
+            del buffer
+
+            with override_settings(RECIPE_IMAGE_MAX_BYTES=len(data),
+                                   RECIPE_IMAGE_MAX_PIXELS=side * side):
+                legacy_peak, legacy_ms = self.measure(
+                    InMemoryBase64ImageField(), data)
+                peak, ms = self.measure(Base64ImageField(), data)
+            self.stdout.write(
+                f'{side:>5}x{side:<6} {len(data) / 2 ** 20:>10.1f} '
+                f'{legacy_peak:>13.1f} {peak:>11.1f} '
+                f'{legacy_ms:>6.0f} / {ms:<6.0f}')
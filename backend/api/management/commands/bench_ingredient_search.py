@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from foodgram.ingredient_index import IngredientIndex
+from foodgram.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = 'compare ingredient autocomplete: in-memory index vs ORM'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--limit', type=int, default=None)
+
+    def measure(self, search, queries, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for query in queries:
+                search(query)
+        return (time.perf_counter() - start) / (repeat * len(queries)) * 1e6
+
+    def handle(self, *args, **options):
+        names = list(Ingredient.objects.values_list('name', flat=True))
+        if not names:
+            raise CommandError('ingredient catalogue is empty, load it first')
+        queries = sorted({
+            name.lower()[:length]
+            for name in names[::max(len(names) // 50, 1)]
+            for length in (1, 2, 3, 5)
+        })
+        limit = options['limit']
+
+        start = time.perf_counter()
+        index = IngredientIndex(Ingredient.objects.all())
+        built = (time.perf_counter() - start) * 1e3
+
+        def orm_search(query):
+            return list(Ingredient.objects.filter(
+                name__istartswith=query)[:limit])
+
+        index_time = self.measure(
+            lambda query: index.search(query, limit),
+            queries, options['repeat'])
+        orm_time = self.measure(orm_search, queries, options['repeat'])
+
+        self.stdout.write(
+            f'{len(names)} ingredients, {len(queries)} prefixes, '
+            f'index built in {built:.1f} ms')
+        self.stdout.write(f'index: {index_time:10.1f} us/query')
+        self.stdout.write(f'orm:   {orm_time:10.1f} us/query')
+        self.stdout.write(f'speed-up: x{orm_time / index_time:.0f}')
@@ -0,0 +1,85 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.v1.paginations import KeysetPagination, RecipePagination
+from foodgram import synthetic
+from foodgram.models import Recipe
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'compare page-number and cursor pagination latency by depth'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1_000_000)
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='reuse the test database between runs')
+
+    def handle(self, *args, **options):
+        with synthetic.test_database(options['keepdb']), \
+                synthetic.rolled_back():
+            self.seed(options['recipes'], options['batch_size'])
+            self.run(options)
+
+    def seed(self, total, batch_size):
+        author = User.objects.create_user(
+            email='bench@example.com', username='bench_paginator',
+            first_name='bench', last_name='bench')
+        start = timezone.now() - timedelta(seconds=total)
+        with synthetic.explicit_created():
+            synthetic.insert(Recipe, (
+                'author_id', 'name', 'text', 'cooking_time', 'image',
+                'created',
+            ), (
+                (author.pk, f'bench {number}', '', 1, '',
+                 start + timedelta(seconds=number))
+                for number in range(total)
+            ), batch_size)
+        self.stdout.write(f'seeded {total} recipes')
+
+    def measure(self, params, repeat):
+        factory = APIRequestFactory()
+        timings = []
+        for _ in range(repeat):
+            request = Request(factory.get('/api/recipes/', params))
+            paginator = RecipePagination()
+            start = time.perf_counter()
+            paginator.paginate_queryset(Recipe.objects.all(), request)
+            timings.append((time.perf_counter() - start) * 1e3)
+        return statistics.median(timings)
+
+    def handle_depth(self, page, options):
+        limit = options['limit']
+        ordered = Recipe.objects.order_by(*RecipePagination.cursor_ordering)
+        params = {'limit': limit, 'cursor': ''}
+        if page > 1:
+            anchor = ordered.only('id', 'created')[(page - 1) * limit - 1]
+            params['cursor'] = KeysetPagination(
+                RecipePagination.cursor_ordering
+            ).encode_token(anchor, reverse=False)
+        page_number = self.measure(
+            {'limit': limit, 'page': page}, options['repeat'])
+        cursor = self.measure(params, options['repeat'])
+        self.stdout.write(f'{page:>10} {page_number:>14.2f} {cursor:>10.2f}')
+
+    def run(self, options):
+        pages = Recipe.objects.count() // options['limit']
+        self.stdout.write(f'{"page":>10} {"page-number ms":>14} '
+                          f'{"cursor ms":>10}')
+        depth = 1
+        while depth < pages:
+            self.handle_depth(depth, options)
+            depth *= 10
+        self.handle_depth(pages, options)
@@ -0,0 +1,78 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.v1.serializers import FastReadRecipeSerializer, ReadRecipeSerializer
+from foodgram import synthetic
+from foodgram.models import Recipe
+from foodgram.versions import bump_version
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'compare the speed of the fast and the regular recipe serializer'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[6, 60, 600])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='reuse the test database between runs')
+
+    def handle(self, *args, **options):
+        with synthetic.test_database(options['keepdb']), \
+                synthetic.rolled_back():
+            self.seed(max(options['sizes']))
+            self.run(options)
+        bump_version('tags')
+
+    def seed(self, total):
+        dataset = synthetic.generate(
+            users=4, recipes=total, ingredients=50, tags=4,
+            favorites=total // 3, carts=0, follows=1,
+            prefix='bench_serializer')
+        self.user = User.objects.get(pk=dataset.users[0])
+        Recipe.objects.filter(pk__in=dataset.recipes[::7]).update(image='')
+        bump_version('tags')
+
+    def request(self):
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = self.user
+        return request
+
+    def render(self, serializer, queryset):
+        context = {'request': self.request()}
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            JSONRenderer().render(
+                serializer(list(queryset), many=True, context=context).data)
+            elapsed = (time.perf_counter() - start) * 1e3
+        return elapsed, len(queries.captured_queries)
+
+    def run(self, options):
+        recipes = Recipe.objects.with_user_flags(self.user)
+        self.stdout.write(
+            f'{"recipes":>8} {"serializer ms":>14} {"fast ms":>8} '
+            f'{"speed-up":>9} {"queries":>8}')
+        for size in options['sizes']:
+            results = []
+            for serializer, queryset in (
+                (ReadRecipeSerializer, recipes.with_related()[:size]),
+                (FastReadRecipeSerializer,
+                 recipes.values(*FastReadRecipeSerializer.fields)[:size]),
+            ):
+                runs = [self.render(serializer, queryset)
+                        for _ in range(options['repeat'])]
+                results.append((min(run[0] for run in runs), runs[0][1]))
+            (slow, slow_queries), (fast, queries) = results
+            self.stdout.write(
+                f'{size:>8} {slow:>14.2f} {fast:>8.2f} '
+                f'{slow / fast:>8.1f}x {slow_queries:>3} / {queries:<3}')
@@ -0,0 +1,66 @@
+import base64
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from api.v1.serializers import CreateRecipeSerializer
+from foodgram import synthetic
+
+from .benchmark_api import image_data
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'measure queries per recipe create as the ingredient count grows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[1, 10, 30, 100])
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='reuse the test database between runs')
+
+    def handle(self, *args, **options):
+        with synthetic.test_database(options['keepdb']), \
+                synthetic.rolled_back():
+            self.run(options['sizes'])
+
+    def run(self, sizes):
+        dataset = synthetic.generate(
+            users=1, recipes=1, ingredients=max(sizes), tags=1, favorites=0,
+            carts=0, follows=0, prefix='bench_writer')
+        request = APIRequestFactory().post('/api/recipes/')
+        request.user = User.objects.get(pk=dataset.users[0])
+        image = ('data:image/png;base64,'
+                 + base64.b64encode(image_data()).decode())
+
+        self.stdout.write(f'{"ingredients":>12} {"queries":>8} {"ms":>8}')
+        for size in sizes:
+            serializer = CreateRecipeSerializer(
+                data={
+                    'name': f'bench {size}',
+                    'text': 'bench',
+                    'cooking_time': 1,
+                    'image': image,
+                    'tags': [dataset.tags[0].pk],
+                    'ingredients': [
+                        {'id': ingredient, 'amount': 1}
+                        for ingredient in dataset.ingredients[:size]
+                    ],
+                },
+                context={'request': request},
+            )
+            start = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                serializer.is_valid(raise_exception=True)
+                recipe = serializer.save()
+            elapsed = (time.perf_counter() - start) * 1e3
+            recipe.image.delete(save=False)
+            self.stdout.write(
+                f'{size:>12} {len(queries.captured_queries):>8} '
+                f'{elapsed:>8.1f}')
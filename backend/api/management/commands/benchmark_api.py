@@ -0,0 +1,394 @@
+import base64
+import io
+import json
+import math
+import statistics
+import time
+from collections import namedtuple
+from itertools import count
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from foodgram import synthetic
+
+User = get_user_model()
+
+Scenario = namedtuple(
+    'Scenario', ('name', 'method', 'status', 'build', 'setup'),
+    defaults=(range,))
+
+MARKS = {'favorite': 'favorites', 'shopping_cart': 'shopping_recipe'}
+
+BUDGETS = {
+    'recipes.list': 5,
+    'recipes.list.auth': 7,
+    'recipes.list.tags': 5,
+    'recipes.list.favorited': 7,
+    'recipes.list.cursor': 4,
+    'recipes.retrieve': 4,
+    'recipes.retrieve.auth': 6,
+    'recipes.create': 12,
+    'recipes.partial_update': 21,
+    'recipes.image': 11,
+    'recipes.destroy': 18,
+    'recipes.favorite.create': 8,
+    'recipes.favorite.destroy': 6,
+    'recipes.shopping_cart.create': 15,
+    'recipes.shopping_cart.destroy': 13,
+    'recipes.download_shopping_cart': 2,
+    'recipes.shopping_cart_summary': 2,
+    'users.create': 4,
+    'users.list': 4,
+    'users.retrieve': 3,
+    'users.me': 2,
+    'users.subscriptions': 4,
+    'users.subscribe.create': 10,
+    'users.subscribe.destroy': 6,
+    'ingredients.list': 1,
+    'ingredients.retrieve': 1,
+    'tags.list': 1,
+    'tags.retrieve': 1,
+}
+
+
+def image_data():
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), 'red').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = ('seed a synthetic dataset into a test database and measure '
+            'latency percentiles and query counts of the API actions')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--recipes', type=int, default=500)
+        parser.add_argument('--ingredients', type=int, default=300)
+        parser.add_argument('--tags', type=int, default=6)
+        parser.add_argument('--favorites', type=int, default=20)
+        parser.add_argument('--carts', type=int, default=5)
+        parser.add_argument('--follows', type=int, default=5)
+        parser.add_argument('--skew', type=float, default=1.0)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='clear the cache before every request')
+        parser.add_argument(
+            '--only', nargs='+', default=(),
+            help='run only actions starting with these prefixes')
+        parser.add_argument('--output', help='write results as json')
+        parser.add_argument(
+            '--compare', help='json results of a previous run to diff with')
+        parser.add_argument(
+            '--max-repeats', type=int, default=0,
+            help='fail on a request repeating one sql statement more often')
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='reuse the test database between runs')
+
+    def handle(self, *args, **options):
+        with synthetic.test_database(options['keepdb']), \
+                override_settings(
+                    RESPONSE_CACHE_TIMEOUT=(
+                        settings.RESPONSE_CACHE_TIMEOUT or 5 * 60),
+                    MEMBERSHIP_CACHE_TIMEOUT=(
+                        settings.MEMBERSHIP_CACHE_TIMEOUT or 60 * 60),
+                    SQL_MAX_REPEATED_QUERIES=options['max_repeats']):
+            results = self.run(options)
+
+        self.report(results, options)
+
+    def run(self, options):
+        cache.clear()
+        start = time.perf_counter()
+        self.dataset = synthetic.generate(
+            users=options['users'], recipes=options['recipes'],
+            ingredients=options['ingredients'], tags=options['tags'],
+            favorites=options['favorites'], carts=options['carts'],
+            follows=options['follows'], skew=options['skew'],
+            seed=options['seed'],
+        )
+        self.stdout.write(
+            f'seeded {len(self.dataset.recipes)} recipes in '
+            f'{time.perf_counter() - start:.1f} s on {connection.vendor}')
+        self.reader = User.objects.get(pk=self.dataset.users[0])
+        self.anonymous = APIClient()
+        token = Token.objects.create(user=self.reader)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.image = image_data()
+        self.sequence = count()
+
+        actions = {}
+        for scenario in self.scenarios(options['iterations']):
+            if options['only'] and not scenario.name.startswith(
+                    tuple(options['only'])):
+                continue
+            actions[scenario.name] = self.measure(
+                scenario, options['iterations'], options['cold'])
+            self.stdout.write(
+                f'{scenario.name:<32} p50 '
+                f'{actions[scenario.name]["p50_ms"]:>8.2f} ms  queries '
+                f'{actions[scenario.name]["queries"]:>3}')
+        return {
+            'meta': {
+                'vendor': connection.vendor,
+                'users': options['users'],
+                'recipes': options['recipes'],
+                'ingredients': options['ingredients'],
+                'iterations': options['iterations'],
+                'cold': options['cold'],
+            },
+            'actions': actions,
+        }
+
+    def measure(self, scenario, iterations, cold):
+        timings, queries = [], []
+        for target in scenario.setup(iterations):
+            client, url, kwargs = scenario.build(target)
+            if cold:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = getattr(client, scenario.method)(url, **kwargs)
+                timings.append((time.perf_counter() - start) * 1e3)
+            queries.append(len(captured.captured_queries))
+            if response.status_code != scenario.status:
+                raise CommandError(
+                    f'{scenario.name}: {scenario.method.upper()} {url} '
+                    f'returned {response.status_code}, expected '
+                    f'{scenario.status}: {response.content[:200]!r}')
+        return {
+            'p50_ms': round(statistics.median(timings), 3),
+            'p90_ms': round(percentile(timings, 0.9), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'max_ms': round(max(timings), 3),
+            'queries': max(queries),
+            'queries_median': statistics.median(queries),
+        }
+
+    def recipe_payload(self, number):
+        dataset = self.dataset
+        image = base64.b64encode(self.image).decode()
+        ingredients = dataset.ingredients
+        return {
+            'name': f'benchmark {number}',
+            'text': 'benchmark',
+            'cooking_time': number % 60 + 1,
+            'image': f'data:image/png;base64,{image}',
+            'tags': [tag.pk for tag in dataset.tags[:2]],
+            'ingredients': [
+                {'id': ingredients[(number + shift) % len(ingredients)],
+                 'amount': number + shift + 1}
+                for shift in range(min(8, len(ingredients)))
+            ],
+        }
+
+    def prepare(self, method, url, **kwargs):
+        response = getattr(self.client, method)(url, **kwargs)
+        if response.status_code >= 300:
+            raise CommandError(
+                f'setup {method.upper()} {url} returned '
+                f'{response.status_code}: {response.content[:200]!r}')
+        return response
+
+    def create_recipes(self, iterations):
+        return [
+            self.prepare(
+                'post', '/api/recipes/',
+                data=self.recipe_payload(next(self.sequence)),
+                format='json').json()['id']
+            for _ in range(iterations)
+        ]
+
+    def unmarked_recipes(self, mark, iterations):
+        marked = set(getattr(self.reader, MARKS[mark]).values_list(
+            'recipe_id', flat=True))
+        recipes = [
+            pk for pk in self.dataset.recipes if pk not in marked
+        ][:iterations]
+        return recipes + self.create_recipes(iterations - len(recipes))
+
+    def marked_recipes(self, mark, iterations):
+        recipes = self.unmarked_recipes(mark, iterations)
+        for pk in recipes:
+            self.prepare('post', f'/api/recipes/{pk}/{mark}/')
+        return recipes
+
+    def unfollowed_authors(self, iterations):
+        followed = set(
+            self.reader.follower.values_list('author_id', flat=True))
+        authors = [
+            pk for pk in self.dataset.users
+            if pk not in followed and pk != self.reader.pk
+        ][:iterations]
+        for _ in range(iterations - len(authors)):
+            number = next(self.sequence)
+            authors.append(User.objects.create_user(
+                email=f'benchmark-author{number}@example.com',
+                username=f'benchmark_author_{number}',
+                first_name='benchmark', last_name=str(number),
+                password=self.dataset.password).pk)
+        return authors
+
+    def followed_authors(self, iterations):
+        authors = self.unfollowed_authors(iterations)
+        for pk in authors:
+            self.prepare('post', f'/api/users/{pk}/subscribe/')
+        return authors
+
+    def scenarios(self, iterations):
+        dataset = self.dataset
+        recipes = list(dataset.recipes)
+        tags = [tag.slug for tag in dataset.tags]
+        pages = max(len(recipes) // 6, 1)
+
+        def cycle(values, number):
+            return values[number % len(values)]
+
+        def get(client, url):
+            return lambda number: (client, url(number), {})
+
+        return (
+            Scenario('recipes.list', 'get', 200, get(
+                self.anonymous,
+                lambda n: f'/api/recipes/?limit=6&page={n % pages + 1}')),
+            Scenario('recipes.list.auth', 'get', 200, get(
+                self.client,
+                lambda n: f'/api/recipes/?limit=6&page={n % pages + 1}')),
+            Scenario('recipes.list.tags', 'get', 200, get(
+                self.anonymous,
+                lambda n: f'/api/recipes/?tags={cycle(tags, n)}'
+                          f'&tags={cycle(tags, n + 1)}')),
+            Scenario('recipes.list.favorited', 'get', 200, get(
+                self.client,
+                lambda n: f'/api/recipes/?is_favorited=1&page='
+                          f'{n % 2 + 1}')),
+            Scenario('recipes.list.cursor', 'get', 200, get(
+                self.anonymous, lambda n: '/api/recipes/?cursor=&limit=6')),
+            Scenario('recipes.retrieve', 'get', 200, get(
+                self.anonymous,
+                lambda n: f'/api/recipes/{cycle(recipes, n)}/')),
+            Scenario('recipes.retrieve.auth', 'get', 200, get(
+                self.client,
+                lambda n: f'/api/recipes/{cycle(recipes, n)}/')),
+            Scenario('recipes.create', 'post', 201, lambda n: (
+                self.client, '/api/recipes/',
+                {'data': self.recipe_payload(n), 'format': 'json'})),
+            Scenario('recipes.partial_update', 'patch', 200, lambda pk: (
+                self.client, f'/api/recipes/{pk}/',
+                {'data': {
+                    'ingredients': self.recipe_payload(pk + 3)['ingredients'],
+                    'tags': [tag.pk for tag in dataset.tags[-2:]],
+                }, 'format': 'json'}), self.create_recipes),
+            Scenario('recipes.image', 'patch', 200, lambda pk: (
+                self.client, f'/api/recipes/{pk}/image/',
+                {'data': {'image': SimpleUploadedFile(
+                    'benchmark.png', self.image, 'image/png')},
+                 'format': 'multipart'}), self.create_recipes),
+            Scenario('recipes.destroy', 'delete', 204, get(
+                self.client, lambda pk: f'/api/recipes/{pk}/'),
+                self.create_recipes),
+            Scenario('recipes.favorite.create', 'post', 201, get(
+                self.client, lambda pk: f'/api/recipes/{pk}/favorite/'),
+                lambda n: self.unmarked_recipes('favorite', n)),
+            Scenario('recipes.favorite.destroy', 'delete', 204, get(
+                self.client, lambda pk: f'/api/recipes/{pk}/favorite/'),
+                lambda n: self.marked_recipes('favorite', n)),
+            Scenario('recipes.shopping_cart.create', 'post', 201, get(
+                self.client, lambda pk: f'/api/recipes/{pk}/shopping_cart/'),
+                lambda n: self.unmarked_recipes('shopping_cart', n)),
+            Scenario('recipes.shopping_cart.destroy', 'delete', 204, get(
+                self.client, lambda pk: f'/api/recipes/{pk}/shopping_cart/'),
+                lambda n: self.marked_recipes('shopping_cart', n)),
+            Scenario('recipes.download_shopping_cart', 'get', 200, get(
+                self.client,
+                lambda n: '/api/recipes/download_shopping_cart/')),
+            Scenario('recipes.shopping_cart_summary', 'get', 200, get(
+                self.client, lambda n: '/api/recipes/shopping_cart_summary/')),
+            Scenario('users.create', 'post', 201, lambda n: (
+                self.anonymous, '/api/users/', {'data': {
+                    'email': f'benchmark{n}@example.com',
+                    'username': f'benchmark_{n}',
+                    'first_name': 'benchmark', 'last_name': str(n),
+                    'password': dataset.password,
+                }, 'format': 'json'})),
+            Scenario('users.list', 'get', 200, get(
+                self.client,
+                lambda n: f'/api/users/?limit=6&offset={n * 6}')),
+            Scenario('users.retrieve', 'get', 200, get(
+                self.client,
+                lambda n: f'/api/users/{cycle(dataset.users, n)}/')),
+            Scenario('users.me', 'get', 200, get(
+                self.client, lambda n: '/api/users/me/')),
+            Scenario('users.subscriptions', 'get', 200, get(
+                self.client,
+                lambda n: '/api/users/subscriptions/?recipes_limit=3')),
+            Scenario('users.subscribe.create', 'post', 201, get(
+                self.client, lambda pk: f'/api/users/{pk}/subscribe/'),
+                self.unfollowed_authors),
+            Scenario('users.subscribe.destroy', 'delete', 204, get(
+                self.client, lambda pk: f'/api/users/{pk}/subscribe/'),
+                self.followed_authors),
+            Scenario('ingredients.list', 'get', 200, get(
+                self.anonymous,
+                lambda n: f'/api/ingredients/?name=synthetic ingredient {n}')),
+            Scenario('ingredients.retrieve', 'get', 200, get(
+                self.anonymous,
+                lambda n: f'/api/ingredients/'
+                          f'{cycle(dataset.ingredients, n)}/')),
+            Scenario('tags.list', 'get', 200, get(
+                self.anonymous, lambda n: '/api/tags/')),
+            Scenario('tags.retrieve', 'get', 200, get(
+                self.anonymous,
+                lambda n: f'/api/tags/{cycle(dataset.tags, n).pk}/')),
+        )
+
+    def report(self, results, options):
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+            self.stdout.write(f'results written to {options["output"]}')
+
+        if options['compare']:
+            with open(options['compare']) as file:
+                baseline = json.load(file)['actions']
+            self.stdout.write(
+                f'{"action":<32} {"p50 ms":>19} {"change":>8} '
+                f'{"queries":>9}')
+            for name, current in results['actions'].items():
+                previous = baseline.get(name)
+                if previous is None:
+                    continue
+                change = (current['p50_ms'] / previous['p50_ms'] - 1) * 100
+                self.stdout.write(
+                    f'{name:<32} {previous["p50_ms"]:>8.2f} -> '
+                    f'{current["p50_ms"]:>8.2f} {change:>+7.1f}% '
+                    f'{previous["queries"]:>3} -> {current["queries"]:<3}')
+
+        exceeded = [
+            f'{name}: {action["queries"]} queries > budget {BUDGETS[name]}'
+            for name, action in results['actions'].items()
+            if action['queries'] > BUDGETS[name]
+        ]
+        if exceeded:
+            raise CommandError(
+                'query budgets exceeded:\n' + '\n'.join(exceeded))
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(results["actions"])} actions within query budgets'))
@@ -0,0 +1,326 @@
+import json
+import random
+import re
+import statistics
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from .benchmark_api import percentile
+
+COLLECTION = (settings.BASE_DIR.parent / 'postman-collection'
+              / 'diploma.postman_collection.json')
+
+Step = namedtuple('Step', (
+    'name', 'method', 'url', 'headers', 'body', 'expected', 'captures'))
+
+PLACEHOLDER = re.compile(r'{{(\w+)}}')
+SET_VARIABLE = re.compile(
+    r'pm\.collectionVariables\.set\(["\'](\w+)["\'],\s*(.+?)\);?$')
+ALIAS = re.compile(r'const (\w+) = _\.get\(responseData, "(\w+)"\);')
+INDEXED = re.compile(
+    r'responseData\[(\d+)\]\.(\w+)(?:\.slice\((\d+),\s*(\d+)\))?')
+EXPECTED_STATUS = re.compile(r'Статус-код ответа должен быть (\d+)')
+UNIQUE_VARIABLE = re.compile(r'(email|username)$', re.IGNORECASE)
+
+
+def parse_captures(script):
+    aliases = dict(ALIAS.findall(script))
+    captures = []
+    for line in script.splitlines():
+        match = SET_VARIABLE.search(line.strip())
+        if match is None:
+            continue
+        variable, expression = match.groups()
+        if expression in aliases:
+            captures.append((variable, None, aliases[expression], None))
+            continue
+        indexed = INDEXED.fullmatch(expression)
+        if indexed is not None:
+            index, field, start, stop = indexed.groups()
+            captures.append((
+                variable, int(index), field,
+                (int(start), int(stop)) if start else None))
+    return captures
+
+
+def auth_headers(auth):
+    if not auth or auth['type'] != 'apikey':
+        return {}
+    options = {option['key']: option['value'] for option in auth['apikey']}
+    if options.get('in', 'header') != 'header':
+        return {}
+    return {options['key']: options['value']}
+
+
+def make_step(item, folder, auth):
+    request = item['request']
+    script = '\n'.join(
+        line
+        for event in item.get('event', ())
+        if event['listen'] == 'test'
+        for line in event['script']['exec']
+    )
+    headers = auth_headers(request.get('auth', auth))
+    headers.update(
+        (header['key'], header['value'])
+        for header in request.get('header', ())
+        if not header.get('disabled')
+    )
+    body = request.get('body') or {}
+    if body.get('mode') == 'raw' and body.get('raw'):
+        body = body['raw']
+        headers.setdefault('Content-Type', 'application/json')
+    else:
+        body = None
+    url = request['url']
+    expected = EXPECTED_STATUS.search(script)
+    return Step(
+        name=f'{folder}/{item["name"]}',
+        method=request['method'],
+        url=url['raw'] if isinstance(url, dict) else url,
+        headers=headers,
+        body=body,
+        expected=int(expected.group(1)) if expected else None,
+        captures=parse_captures(script),
+    )
+
+
+def collect_steps(items, folder, auth):
+    for item in items:
+        if 'item' in item:
+            yield from collect_steps(
+                item['item'], item['name'], item.get('auth', auth))
+        else:
+            yield make_step(item, folder, auth)
+
+
+def load_collection(path):
+    with open(path) as file:
+        collection = json.load(file)
+    variables = {
+        variable['key']: variable['value']
+        for variable in collection.get('variable', ())
+    }
+    flows = [
+        (item['name'], list(collect_steps(
+            item.get('item', (item,)), item['name'],
+            item.get('auth', collection.get('auth')))))
+        for item in collection['item']
+    ]
+    return variables, flows
+
+
+def substitute(template, variables):
+    if template is None:
+        return None
+    return PLACEHOLDER.sub(
+        lambda match: str(variables.get(match.group(1), match.group(0))),
+        template)
+
+
+def uniquify(variables, token):
+    variables = dict(variables)
+    for key, value in variables.items():
+        if not UNIQUE_VARIABLE.search(key) or not value.startswith('"'):
+            continue
+        if '@' in value:
+            local, domain = value.split('@', 1)
+            variables[key] = f'{local}.{token}@{domain}'
+        else:
+            variables[key] = f'{value[:-1]}.{token}"'
+    return variables
+
+
+class Command(BaseCommand):
+    help = ('replay the postman collection flows with concurrent virtual '
+            'users against a running server and report latency per request')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--collection', default=str(COLLECTION))
+        parser.add_argument(
+            '--base-url', help='defaults to baseUrl of the collection')
+        parser.add_argument('--users', type=int, default=4)
+        parser.add_argument(
+            '--iterations', type=int, default=1,
+            help='collection runs per virtual user, 0 for no limit')
+        parser.add_argument(
+            '--duration', type=float, default=None,
+            help='stop after this many seconds')
+        parser.add_argument(
+            '--ramp-up', type=float, default=0,
+            help='seconds over which virtual users are started')
+        parser.add_argument(
+            '--think-time', type=float, default=0,
+            help='mean pause between requests of a virtual user, seconds')
+        parser.add_argument(
+            '--mix', nargs='+', default=(), metavar='FOLDER=COUNT',
+            help='repeat top level folders per iteration, 0 skips them')
+        parser.add_argument(
+            '--exclude', nargs='+', default=(),
+            help='skip requests whose folder/name contains these strings')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--output', help='write results as json')
+
+    def plan(self, flows, mix, exclude):
+        repeats = {}
+        for option in mix:
+            prefix, _, count = option.partition('=')
+            matched = [name for name, _ in flows if name.startswith(prefix)]
+            if not matched or not count.isdigit():
+                raise CommandError(
+                    f'invalid mix {option!r}, folders: '
+                    + ', '.join(name for name, _ in flows))
+            repeats.update((name, int(count)) for name in matched)
+        return [
+            step
+            for name, steps in flows
+            for _ in range(repeats.get(name, 1))
+            for step in steps
+            if not any(pattern in step.name for pattern in exclude)
+        ]
+
+    def record(self, step, duration, status):
+        with self.lock:
+            result = self.results[step.name]
+            if status is None:
+                result['failed'] += 1
+                return
+            result['latencies'].append(duration)
+            if status >= 500:
+                result['failed'] += 1
+            elif step.expected is not None and status != step.expected:
+                result['unexpected'] += 1
+
+    def send(self, session, step, variables, timeout):
+        url = substitute(step.url, variables)
+        headers = {
+            key: substitute(value, variables)
+            for key, value in step.headers.items()
+        }
+        body = substitute(step.body, variables)
+        start = time.perf_counter()
+        try:
+            response = session.request(
+                step.method, url, headers=headers,
+                data=body.encode() if body else None, timeout=timeout)
+        except requests.RequestException:
+            self.record(step, None, None)
+            return
+        self.record(step, time.perf_counter() - start, response.status_code)
+        if not step.captures:
+            return
+        try:
+            data = response.json()
+        except ValueError:
+            return
+        for variable, index, field, part in step.captures:
+            try:
+                value = (data if index is None else data[index])[field]
+            except (IndexError, KeyError, TypeError):
+                continue
+            if part is not None:
+                value = value[part[0]:part[1]]
+            if value:
+                variables[variable] = value
+
+    def virtual_user(self, number, steps, variables, options):
+        time.sleep(number * options['ramp_up'] / options['users'])
+        session = requests.Session()
+        iteration = 0
+        while not options['iterations'] or iteration < options['iterations']:
+            user_variables = uniquify(
+                variables, f'{self.run_id}{number}x{iteration}')
+            for step in steps:
+                if time.monotonic() >= self.deadline:
+                    return
+                self.send(session, step, user_variables, options['timeout'])
+                if options['think_time']:
+                    time.sleep(random.uniform(0, 2 * options['think_time']))
+            iteration += 1
+
+    def handle(self, *args, **options):
+        if not options['iterations'] and not options['duration']:
+            raise CommandError('set --iterations or --duration')
+        variables, flows = load_collection(options['collection'])
+        if options['base_url']:
+            variables['baseUrl'] = options['base_url'].rstrip('/')
+        steps = self.plan(flows, options['mix'], options['exclude'])
+        if not steps:
+            raise CommandError('no requests left to replay')
+
+        self.lock = threading.Lock()
+        self.results = {
+            step.name: {'latencies': [], 'unexpected': 0, 'failed': 0}
+            for step in steps
+        }
+        self.run_id = uuid.uuid4().hex[:6]
+        self.deadline = time.monotonic() + (options['duration'] or 1e9)
+        threads = [
+            threading.Thread(
+                target=self.virtual_user,
+                args=(number, steps, variables, options), daemon=True)
+            for number in range(options['users'])
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.report(time.perf_counter() - start, options)
+
+    def report(self, elapsed, options):
+        summary = {}
+        for name, result in self.results.items():
+            latencies = [value * 1000 for value in result['latencies']]
+            if not latencies:
+                summary[name] = {
+                    'requests': 0, 'failed': result['failed']}
+                continue
+            summary[name] = {
+                'requests': len(latencies),
+                'rps': round(len(latencies) / elapsed, 3),
+                'p50_ms': round(statistics.median(latencies), 3),
+                'p95_ms': round(percentile(latencies, 0.95), 3),
+                'p99_ms': round(percentile(latencies, 0.99), 3),
+                'max_ms': round(max(latencies), 3),
+                'unexpected': result['unexpected'],
+                'failed': result['failed'],
+            }
+
+        self.stdout.write(
+            f'{"request":<72} {"count":>6} {"rps":>7} {"p50":>8} '
+            f'{"p95":>8} {"p99":>8} {"unexp":>5} {"fail":>5}')
+        for name, row in summary.items():
+            if not row['requests']:
+                self.stdout.write(
+                    f'{name[:72]:<72} {0:>6} {"-":>7} {"-":>8} {"-":>8} '
+                    f'{"-":>8} {"-":>5} {row["failed"]:>5}')
+                continue
+            self.stdout.write(
+                f'{name[:72]:<72} {row["requests"]:>6} {row["rps"]:>7.2f} '
+                f'{row["p50_ms"]:>8.1f} {row["p95_ms"]:>8.1f} '
+                f'{row["p99_ms"]:>8.1f} {row["unexpected"]:>5} '
+                f'{row["failed"]:>5}')
+        total = sum(row['requests'] for row in summary.values())
+        self.stdout.write(
+            f'{total} requests from {options["users"]} virtual users in '
+            f'{elapsed:.1f} s, {total / elapsed:.1f} requests/s')
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump({
+                    'meta': {
+                        'users': options['users'],
+                        'elapsed_s': round(elapsed, 3),
+                        'think_time': options['think_time'],
+                        'mix': list(options['mix']),
+                    },
+                    'requests': summary,
+                }, file, indent=2, ensure_ascii=False)
+            self.stdout.write(f'results written to {options["output"]}')
@@ -0,0 +1,83 @@
+import io
+import json
+import os
+import pstats
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'list the slowest captured request profiles per view action'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directory', default=settings.PROFILING_DIR)
+        parser.add_argument(
+            '--limit', type=int, default=3,
+            help='profiles to list per view action')
+        parser.add_argument(
+            '--functions', type=int, default=15,
+            help='functions to print for the slowest profile, 0 to skip')
+        parser.add_argument(
+            '--sort', default='cumulative', choices=('cumulative', 'tottime'))
+        parser.add_argument(
+            '--action', default='',
+            help='only view actions starting with this prefix')
+
+    def load(self, directory):
+        profiles = defaultdict(list)
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith('.json'):
+                continue
+            path = os.path.join(directory, filename)
+            if not os.path.exists(path[:-len('.json')] + '.prof'):
+                continue
+            try:
+                with open(path) as file:
+                    meta = json.load(file)
+            except (OSError, ValueError):
+                continue
+            meta['id'] = filename[:-len('.json')]
+            profiles[f'{meta["view"]}.{meta["action"]}'].append(meta)
+        return profiles
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        if not directory or not os.path.isdir(directory):
+            raise CommandError(
+                'profiles directory not found, set PROFILING_DIR or pass '
+                '--directory')
+        profiles = self.load(directory)
+        actions = sorted(
+            (
+                (name, captured) for name, captured in profiles.items()
+                if name.startswith(options['action'])
+            ),
+            key=lambda item: -max(meta['duration_ms'] for meta in item[1]),
+        )
+        if not actions:
+            self.stdout.write('no profiles captured')
+            return
+
+        for name, captured in actions:
+            captured.sort(key=lambda meta: -meta['duration_ms'])
+            durations = sorted(meta['duration_ms'] for meta in captured)
+            self.stdout.write(
+                f'{name}: {len(captured)} profiles, median '
+                f'{durations[len(durations) // 2]:.1f} ms, max '
+                f'{durations[-1]:.1f} ms')
+            for meta in captured[:options['limit']]:
+                self.stdout.write(
+                    f'  {meta["duration_ms"]:>9.1f} ms  db '
+                    f'{meta["db_ms"]:>8.1f} ms  {meta["queries"]:>3} sql  '
+                    f'{meta["status"]} {meta["method"]} {meta["path"]}  '
+                    f'{meta["id"]}')
+            if options['functions']:
+                output = io.StringIO()
+                stats = pstats.Stats(
+                    os.path.join(directory, f'{captured[0]["id"]}.prof'),
+                    stream=output)
+                stats.strip_dirs().sort_stats(options['sort']).print_stats(
+                    options['functions'])
+                self.stdout.write(output.getvalue())
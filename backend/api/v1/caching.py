@@ -0,0 +1,97 @@
+import abc
+import hashlib
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from foodgram.versions import get_version
+
+_lock = threading.Lock()
+stats = Counter()
+
+
+def record(event):
+    with _lock:
+        stats[event] += 1
+
+
+class ResponseCacheMixin(metaclass=abc.ABCMeta):
+    cache_version = None
+    private_query_params = ()
+
+    def cache_key(self, request, scope):
+        params = sorted(
+            (key, sorted(values))
+            for key, values in request.query_params.lists()
+        )
+        digest = hashlib.md5(repr((
+            request.build_absolute_uri(request.path),
+            request.accepted_media_type, params,
+        )).encode()).hexdigest()
+        version = get_version(self.cache_version)
+        return f'response:{scope}:{self.cache_version}:{version}:{digest}'
+
+    @abc.abstractmethod
+    def personalize(self, data):
+        pass
+
+    def anonymous_response(self, handler, request, *args, **kwargs):
+        key = self.cache_key(request, 'anonymous')
+        cached = cache.get(key)
+        if cached is not None:
+            record('hits')
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        record('misses')
+        response = handler(request, *args, **kwargs)
+        response['X-Cache'] = 'MISS'
+        if response.status_code == 200:
+            response.add_post_render_callback(
+                lambda response: cache.set(
+                    key, (response.content, response['Content-Type']),
+                    settings.RESPONSE_CACHE_TIMEOUT,
+                )
+            )
+        return response
+
+    def shared_response(self, handler, request, *args, **kwargs):
+        key = self.cache_key(request, 'shared')
+        data = cache.get(key)
+        if data is not None:
+            record('shared_hits')
+            response = Response(self.personalize(data))
+            response['X-Cache'] = 'HIT'
+            return response
+
+        record('shared_misses')
+        response = handler(request, *args, **kwargs)
+        response['X-Cache'] = 'MISS'
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        return response
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if (request.method not in SAFE_METHODS
+                or not settings.RESPONSE_CACHE_TIMEOUT):
+            return handler(request, *args, **kwargs)
+        if not request.user.is_authenticated:
+            return self.anonymous_response(handler, request, *args, **kwargs)
+        if any(param in request.query_params
+               for param in self.private_query_params):
+            return handler(request, *args, **kwargs)
+        return self.shared_response(handler, request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs)
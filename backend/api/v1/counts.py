@@ -0,0 +1,86 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from foodgram.versions import counts_version, get_version
+
+
+class CountProvider:
+    pagination_query_params = ('page', 'limit', 'offset', 'cursor')
+
+    def __init__(self, request, private_query_params=(), cache_counts=True):
+        self.request = request
+        self.cache_counts = cache_counts and not any(
+            param in request.query_params for param in private_query_params)
+
+    def cache_key(self, queryset):
+        params = sorted(
+            (key, sorted(values))
+            for key, values in self.request.query_params.lists()
+            if key not in self.pagination_query_params
+        )
+        digest = hashlib.md5(
+            repr((self.request.path, params)).encode()).hexdigest()
+        version = get_version(counts_version(queryset.model))
+        return f'count:{queryset.model._meta.label_lower}:{version}:{digest}'
+
+    def estimate(self, queryset):
+        connection = connections[queryset.db]
+        if queryset.query.where or connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row is None or row[0] < settings.PAGINATION_COUNT_ESTIMATE_MIN:
+            return None
+        return row[0]
+
+    def count(self, queryset):
+        if self.cache_counts:
+            key = self.cache_key(queryset)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+        estimate = self.estimate(queryset)
+        if estimate is not None:
+            result = estimate, False
+        else:
+            result = queryset.count(), True
+        if self.cache_counts:
+            cache.set(key, result, settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+        return result
+
+
+class CountedPaginator(Paginator):
+    def __init__(self, object_list, per_page, counter, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.counter = counter
+
+    @cached_property
+    def count(self):
+        count, self.count_exact = self.counter(self.object_list)
+        return count
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if self.count_exact or int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if self.count_exact:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(
+            self.object_list[bottom:bottom + self.per_page], number, self)
@@ -1,21 +1,32 @@
 import django_filters
+from django.db.models import F
 from django_filters.rest_framework import FilterSet
-from rest_framework.filters import SearchFilter
 
 from foodgram.models import Tag
+from foodgram.tag_registry import get_tag_registry
+
+
+def tag_choices():
+    return [(tag.slug, tag.name) for tag in get_tag_registry().tags]
 
 
 class RecipeFilter(FilterSet):
-    tags = django_filters.ModelMultipleChoiceFilter(field_name='tags__slug',
-                                                    to_field_name='slug',
-                                                    lookup_expr='exact',
-                                                    queryset=Tag.objects.all()
-                                                    )
+    tags = django_filters.MultipleChoiceFilter(choices=tag_choices,
+                                               method='filter_tags')
     is_favorited = django_filters.NumberFilter(method='favorite')
     is_in_shopping_cart = django_filters.NumberFilter(method='shopping_cart')
     author = django_filters.NumberFilter(
         field_name='author__id', lookup_expr='exact', label='author')
 
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        tags = get_tag_registry().by_slug
+        return queryset.annotate(
+            matched_tags=F('tags_mask').bitand(
+                Tag.mask_of(tags[slug] for slug in value))
+        ).exclude(matched_tags=0)
+
     def favorite(self, queryset, name, value):
         if value == 1:
             return queryset.filter(favorites__user_id=self.request.user.id)
@@ -26,7 +37,3 @@ class RecipeFilter(FilterSet):
             return queryset.filter(
                 shopping_recipe__user_id=self.request.user.id)
         return queryset
-
-
-class IngredientSearch(SearchFilter):
-    search_param = 'name'
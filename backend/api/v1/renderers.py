@@ -0,0 +1,64 @@
+import abc
+import csv
+import io
+import json
+
+from rest_framework import renderers
+
+
+class ShoppingListRenderer(renderers.BaseRenderer, metaclass=abc.ABCMeta):
+    charset = "utf-8"
+
+    @abc.abstractmethod
+    def stream(self, ingredients):
+        pass
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            return str(data.get("detail", data)).encode(self.charset)
+        return "".join(self.stream(data)).encode(self.charset)
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = "text/plain"
+    format = "txt"
+
+    def stream(self, ingredients):
+        for ingredient, measurement_unit, amount in ingredients:
+            yield (
+                f"Ингредиент: {ingredient},"
+                f"Единица измерения: {measurement_unit},"
+                f"Количество: {amount}\n"
+            )
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+    def stream(self, ingredients):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(("name", "measurement_unit", "amount"))
+        for row in ingredients:
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+
+class ShoppingListJSONRenderer(renderers.JSONRenderer):
+    def stream(self, ingredients):
+        separator = "["
+        for ingredient, measurement_unit, amount in ingredients:
+            yield separator + json.dumps(
+                {
+                    "name": ingredient,
+                    "measurement_unit": measurement_unit,
+                    "amount": amount,
+                },
+                ensure_ascii=False,
+            )
+            separator = ","
+        yield "[]" if separator == "[" else "]"
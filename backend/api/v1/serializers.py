@@ -1,18 +1,35 @@
 import base64
+import binascii
+import io
+
+from PIL import Image
 from webcolors import hex_to_name, hex_to_rgb
 
-from django.core.exceptions import ObjectDoesNotExist
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
 from django.db import transaction
-from djoser.serializers import UserCreateSerializer, UserSerializer
+from django.utils.encoding import filepath_to_uri
+from djoser.serializers import UserCreateSerializer
 from rest_framework import serializers
 
 from foodgram.constants import MAX_VALUE, MIN_VALUE
+from foodgram import counters, shopping_list
+from foodgram.memberships import Memberships
+from foodgram.renditions import rendition_names, schedule_renditions
+from foodgram.tag_registry import get_tag_registry
+from foodgram.versions import bump_on_commit, counts_version
 from foodgram.models import (Follow, Ingredient, Recipe,
-                             RecipeIngredient, Tag)
+                             RecipeIngredient, ShoppingListItem, Tag)
 from user.models import User
 
 
+def get_memberships(context):
+    if "memberships" not in context:
+        context["memberships"] = Memberships(context["request"].user)
+    return context["memberships"]
+
+
 class Hex2NameColor(serializers.Field):
     def to_representation(self, value):
         return value
@@ -26,13 +43,84 @@ class Hex2NameColor(serializers.Field):
         return data
 
 
+BASE64_CHUNK_SIZE = 64 * 1024
+
+IMAGE_HEADER_MAX_SIZE = 1024 * 1024
+
+
+def check_image_bytes(size):
+    if size > settings.RECIPE_IMAGE_MAX_BYTES:
+        raise serializers.ValidationError(
+            "Размер изображения не должен превышать "
+            f"{settings.RECIPE_IMAGE_MAX_BYTES} байт.")
+
+
+def check_image_dimensions(file):
+    try:
+        with Image.open(file) as image:
+            width, height = image.size
+    except Image.DecompressionBombError:
+        width, height = settings.RECIPE_IMAGE_MAX_PIXELS + 1, 1
+    except (OSError, SyntaxError, ValueError):
+        return False
+    if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+        raise serializers.ValidationError(
+            "Изображение не должно превышать "
+            f"{settings.RECIPE_IMAGE_MAX_PIXELS} пикселей.")
+    return True
+
+
+def base64_chunks(data, start):
+    pending = ""
+    for offset in range(start, len(data), BASE64_CHUNK_SIZE):
+        pending += "".join(data[offset:offset + BASE64_CHUNK_SIZE].split())
+        usable = len(pending) - len(pending) % 4
+        yield base64.b64decode(pending[:usable])
+        pending = pending[usable:]
+    if pending:
+        yield base64.b64decode(pending)
+
+
+def decode_base64_image(data, start, ext):
+    check_image_bytes((len(data) - start) // 4 * 3)
+    image_file = TemporaryUploadedFile(
+        f"temp.{ext}", f"image/{ext}", 0, None)
+    header = b""
+    try:
+        for chunk in base64_chunks(data, start):
+            if header is not None:
+                header += chunk
+                if (check_image_dimensions(io.BytesIO(header))
+                        or len(header) > IMAGE_HEADER_MAX_SIZE):
+                    header = None
+            image_file.write(chunk)
+    except binascii.Error:
+        image_file.close()
+        raise serializers.ValidationError(
+            "Изображение должно быть закодировано в base64.")
+    except serializers.ValidationError:
+        image_file.close()
+        raise
+    image_file.size = image_file.tell()
+    image_file.seek(0)
+    return image_file
+
+
 class Base64ImageField(serializers.ImageField):
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith("data:image"):
-            format, imgstr = data.split(";base64,")
-            ext = format.split("/")[-1]
-
-            data = ContentFile(base64.b64decode(imgstr), name="temp." + ext)
+            separator = data.find(";base64,")
+            if separator == -1:
+                raise serializers.ValidationError(
+                    "Изображение должно быть закодировано в base64.")
+            ext = data[:separator].split("/")[-1]
+
+            data = decode_base64_image(
+                data, separator + len(";base64,"), ext)
+        elif isinstance(data, UploadedFile):
+            check_image_bytes(data.size)
+            check_image_dimensions(data)
+            data.seek(0)
 
         return super().to_internal_value(data)
 
@@ -42,15 +130,84 @@ class TagSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Tag
-        fields = "__all__"
+        fields = ("id", "name", "slug", "color")
+
+
+def tag_representations():
+    registry = get_tag_registry()
+    if not registry.representations:
+        registry.representations.update(
+            (tag.pk, TagSerializer(tag).data) for tag in registry.tags)
+    return registry.representations
+
+
+class RegistryTagsField(serializers.Field):
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, tags):
+        representations = tag_representations()
+        return [
+            representations.get(tag.pk) or TagSerializer(tag).data
+            for tag in tags.all()
+        ]
+
+
+class RegistryTagPrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    def to_internal_value(self, data):
+        if isinstance(data, int) and not isinstance(data, bool):
+            tag = get_tag_registry().by_id.get(data)
+            if tag is not None:
+                return tag
+        return super().to_internal_value(data)
+
+
+class ImageRenditionsField(serializers.Field):
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        kwargs.setdefault("source", "image")
+        super().__init__(**kwargs)
+
+    def to_representation(self, image):
+        if not image:
+            return None
+        return rendition_urls(
+            image.storage, image.name, self.context.get("request"))
+
+
+def absolute_url(url, request):
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def rendition_urls(storage, image_name, request, media_url=None):
+    if media_url is None:
+        def media_url(name):
+            return absolute_url(storage.url(name), request)
+    return {
+        str(width): {
+            extension: media_url(name) for extension, name in names.items()
+        }
+        for width, names in rendition_names(image_name).items()
+    }
+
+
+def media_url_builder(request):
+    if not isinstance(default_storage, FileSystemStorage):
+        return lambda name: absolute_url(default_storage.url(name), request)
+    prefix = absolute_url(default_storage.base_url, request)
+    return lambda name: prefix + filepath_to_uri(name)
 
 
 class BaseRecipeSerializer(serializers.ModelSerializer):
     image = Base64ImageField(required=True, allow_null=False)
+    image_renditions = ImageRenditionsField()
 
     class Meta:
         model = Recipe
-        fields = ("id", "name", "image", "cooking_time")
+        fields = ("id", "name", "image", "image_renditions", "cooking_time")
 
 
 class FavoriteOrShoppingRecipeSerializer(BaseRecipeSerializer):
@@ -66,6 +223,11 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "measurement_unit")
 
 
+class IngredientSearchSerializer(serializers.Serializer):
+    name = serializers.CharField(required=False, allow_blank=True)
+    limit = serializers.IntegerField(min_value=1, required=False)
+
+
 class CustomUserSerializer(UserCreateSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
@@ -75,11 +237,7 @@ class CustomUserSerializer(UserCreateSerializer):
                   "last_name", "is_subscribed")
 
     def get_is_subscribed(self, obj):
-        user = self.context["request"].user
-
-        if user.is_authenticated:
-            return obj.follow.filter(user=user).exists()
-        return False
+        return get_memberships(self.context)("following", obj.pk)
 
 
 class CustomCreateUserSerializer(CustomUserSerializer):
@@ -101,14 +259,20 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "measurement_unit", "amount")
 
 
+class ShoppingListItemSerializer(RecipeIngredientSerializer):
+    class Meta(RecipeIngredientSerializer.Meta):
+        model = ShoppingListItem
+
+
 class ReadRecipeSerializer(serializers.ModelSerializer):
-    tags = TagSerializer(many=True)
-    author = UserSerializer()
+    tags = RegistryTagsField()
+    author = CustomUserSerializer(read_only=True)
     ingredients = RecipeIngredientSerializer(
         source="ingredients_for_recipe", many=True
     )
-    is_favorited = serializers.SerializerMethodField()
-    is_in_shopping_cart = serializers.SerializerMethodField()
+    is_favorited = serializers.BooleanField(read_only=True)
+    is_in_shopping_cart = serializers.BooleanField(read_only=True)
+    image_renditions = ImageRenditionsField()
 
     class Meta:
         model = Recipe
@@ -117,29 +281,95 @@ class ReadRecipeSerializer(serializers.ModelSerializer):
             "author",
             "name",
             "image",
+            "image_renditions",
             "tags",
             "text",
             "cooking_time",
             "ingredients",
             "is_favorited",
             "is_in_shopping_cart",
+            "favorites_count",
         )
 
-    def get_is_favorited(self, obj):
-        request = self.context['request']
-        user = request.user
-        recipe = obj
-        if user.is_authenticated:
-            return recipe.favorites.filter(user=user).exists()
-        return False
 
-    def get_is_in_shopping_cart(self, obj):
-        request = self.context['request']
-        user = request.user
-        recipe = obj
-        if user.is_authenticated:
-            return recipe.shopping_recipe.filter(user=user).exists()
-        return False
+class FastRecipeListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        return self.child.represent_many(list(data))
+
+
+class FastReadRecipeSerializer(serializers.BaseSerializer):
+    fields = (
+        "id", "name", "image", "text", "cooking_time", "is_favorited",
+        "is_in_shopping_cart", "favorites_count", "author_id",
+        "author__email", "author__username", "author__first_name",
+        "author__last_name", "created",
+    )
+
+    class Meta:
+        list_serializer_class = FastRecipeListSerializer
+
+    def to_representation(self, instance):
+        return self.represent_many([instance])[0]
+
+    def represent_many(self, rows):
+        request = self.context.get("request")
+        media_url = media_url_builder(request)
+        memberships = get_memberships(self.context)
+        recipe_ids = [row["id"] for row in rows]
+
+        recipe_tags = list(Recipe.tags.through.objects.filter(
+            recipe_id__in=recipe_ids
+        ).order_by("tag__name").values_list("recipe_id", "tag_id"))
+        representations = tag_representations()
+        missing = {
+            tag_id for _, tag_id in recipe_tags
+            if tag_id not in representations
+        }
+        if missing:
+            representations = dict(representations)
+            representations.update(
+                (tag.pk, TagSerializer(tag).data)
+                for tag in Tag.objects.filter(pk__in=missing))
+        tags = {recipe_id: [] for recipe_id in recipe_ids}
+        for recipe_id, tag_id in recipe_tags:
+            if tag_id in representations:
+                tags[recipe_id].append(representations[tag_id])
+
+        ingredients = {recipe_id: [] for recipe_id in recipe_ids}
+        for recipe_id, *ingredient in RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list("recipe_id", "ingredient_id", "ingredient__name",
+                      "ingredient__measurement_unit", "amount"):
+            ingredients[recipe_id].append(dict(zip(
+                ("id", "name", "measurement_unit", "amount"), ingredient)))
+
+        return [
+            {
+                "id": row["id"],
+                "author": {
+                    "id": row["author_id"],
+                    "email": row["author__email"],
+                    "username": row["author__username"],
+                    "first_name": row["author__first_name"],
+                    "last_name": row["author__last_name"],
+                    "is_subscribed": memberships(
+                        "following", row["author_id"]),
+                },
+                "name": row["name"],
+                "image": media_url(row["image"]) if row["image"] else None,
+                "image_renditions": rendition_urls(
+                    default_storage, row["image"], request, media_url
+                ) if row["image"] else None,
+                "tags": tags[row["id"]],
+                "text": row["text"],
+                "cooking_time": row["cooking_time"],
+                "ingredients": ingredients[row["id"]],
+                "is_favorited": bool(row["is_favorited"]),
+                "is_in_shopping_cart": bool(row["is_in_shopping_cart"]),
+                "favorites_count": row["favorites_count"],
+            }
+            for row in rows
+        ]
 
 
 class CreateIngredientSerializer(serializers.ModelSerializer):
@@ -151,11 +381,32 @@ class CreateIngredientSerializer(serializers.ModelSerializer):
         fields = ("id", "amount")
 
 
-class CreateRecipeSerializer(serializers.ModelSerializer):
+class RecipeImageSerializer(serializers.ModelSerializer):
+    image = Base64ImageField(use_url=True)
+
+    class Meta:
+        model = Recipe
+        fields = ("image",)
+
+    def save(self, **kwargs):
+        instance = super().save(**kwargs)
+        image = self.validated_data.get("image")
+        if image is not None:
+            image.close()
+            schedule_renditions(instance.image.name)
+        return instance
+
+    def to_representation(self, instance):
+        user = self.context.get("request").user
+        instance = Recipe.objects.with_related().with_user_flags(user).get(
+            pk=instance.pk)
+        return ReadRecipeSerializer(instance, context=self.context).data
+
+
+class CreateRecipeSerializer(RecipeImageSerializer):
     ingredients = CreateIngredientSerializer(many=True)
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = RegistryTagPrimaryKeyField(
         many=True, queryset=Tag.objects.all())
-    image = Base64ImageField(use_url=True)
     cooking_time = serializers.IntegerField(
         min_value=MIN_VALUE, max_value=MAX_VALUE)
 
@@ -176,22 +427,31 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         if ingredients is None:
             raise serializers.ValidationError(
                 'Обязательно добавьте поле ингредиентов.')
-        id_ingredients = [ingredient['id'] for ingredient in ingredients]
-
-        tags = data.get("tags")
-        try:
-            for ingredient_id in id_ingredients:
-                Ingredient.objects.get(pk=ingredient_id)
-        except ObjectDoesNotExist:
-            raise serializers.ValidationError(
-                f"Ингредиент с id {ingredient_id} не существует")
+        self.check_ingredients(ingredients)
+        self.check_tags(data.get("tags"))
+        return data
 
+    def check_ingredients(self, ingredients):
+        id_ingredients = [ingredient['id'] for ingredient in ingredients]
         if not ingredients:
             raise serializers.ValidationError(
                 "Нужно добавить хотя бы один ингредиент")
         if len(id_ingredients) != len(set(id_ingredients)):
             raise serializers.ValidationError(
                 'Нельзя добавлять одинаковые ингредиенты')
+
+        existing = set(Ingredient.objects.filter(
+            pk__in=id_ingredients).values_list("pk", flat=True))
+        missing = [str(ingredient_id) for ingredient_id in id_ingredients
+                   if ingredient_id not in existing]
+        if len(missing) == 1:
+            raise serializers.ValidationError(
+                f"Ингредиент с id {missing[0]} не существует")
+        if missing:
+            raise serializers.ValidationError(
+                f"Ингредиенты с id {', '.join(missing)} не существуют")
+
+    def check_tags(self, tags):
         if not tags:
             raise serializers.ValidationError(
                 "Нужно добавить хотя бы один тег.")
@@ -199,70 +459,119 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 'Нельзя добавлять одинаковые теги.')
 
-        return data
-
     def create_ingredients(self, ingredients, recipe):
-        all_ingrediets = []
-        for element in ingredients:
-            id = element["id"]
-            ingredient = Ingredient.objects.get(pk=id)
-            amount = element["amount"]
-            recipe_ingredient = RecipeIngredient(
-                ingredient=ingredient, recipe=recipe, amount=amount
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                ingredient_id=element["id"],
+                recipe=recipe,
+                amount=element["amount"],
             )
-            all_ingrediets.append(recipe_ingredient)
+            for element in ingredients
+        )
 
-        with transaction.atomic():
-            RecipeIngredient.objects.bulk_create(all_ingrediets)
+    def create_tags(self, tags, recipe):
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(tag=tag, recipe=recipe) for tag in tags
+        )
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop("ingredients")
         tags = validated_data.pop("tags")
 
         user = self.context.get("request").user
-        recipe = Recipe.objects.create(**validated_data, author=user)
+        recipe = Recipe.objects.create(
+            **validated_data, author=user, tags_mask=Tag.mask_of(tags))
+        counters.update(User, user.pk, "recipes_count", 1)
         self.create_ingredients(ingredients, recipe)
-        recipe.tags.set(tags)
+        self.create_tags(tags, recipe)
         return recipe
 
+    def update_ingredients(self, ingredients, recipe):
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe.ingredients_for_recipe.all()
+        }
+        old_amounts = {
+            ingredient_id: recipe_ingredient.amount
+            for ingredient_id, recipe_ingredient in current.items()
+        }
+        new_amounts = {
+            ingredient["id"]: ingredient["amount"]
+            for ingredient in ingredients
+        }
+
+        changed = []
+        for ingredient_id, recipe_ingredient in current.items():
+            amount = new_amounts.get(ingredient_id)
+            if amount is not None and amount != recipe_ingredient.amount:
+                recipe_ingredient.amount = amount
+                changed.append(recipe_ingredient)
+        removed = [
+            recipe_ingredient.pk
+            for ingredient_id, recipe_ingredient in current.items()
+            if ingredient_id not in new_amounts
+        ]
+        added = [
+            ingredient for ingredient in ingredients
+            if ingredient["id"] not in current
+        ]
+
+        if removed:
+            RecipeIngredient.objects.filter(pk__in=removed).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ["amount"])
+        if added:
+            self.create_ingredients(added, recipe)
+        shopping_list.change_recipe(recipe, old_amounts, new_amounts)
+
+    def update_tags(self, tags, recipe):
+        recipe_tags = Recipe.tags.through.objects.filter(recipe=recipe)
+        current = set(recipe_tags.values_list("tag_id", flat=True))
+        new = {tag.pk for tag in tags}
+        if current != new:
+            bump_on_commit(counts_version(Recipe))
+        if current - new:
+            recipe_tags.filter(tag_id__in=current - new).delete()
+        self.create_tags(
+            [tag for tag in tags if tag.pk not in current], recipe)
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.name = validated_data.get('name', instance.name)
-        instance.text = validated_data.get('text', instance.text)
-        instance.cooking_time = validated_data.get('cooking_time',
-                                                   instance.cooking_time)
-        instance.image = validated_data.get('image', instance.image)
-        instance.ingredients_for_recipe.all().delete()
-        instance.tags_for_the_recipe.all().delete()
-
-        self.create_ingredients(validated_data.pop('ingredients'), instance)
-        instance.tags.set(validated_data.pop('tags'))
-
+        ingredients = validated_data.pop("ingredients")
+        tags = validated_data.pop("tags")
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.tags_mask = Tag.mask_of(tags)
         instance.save()
-        return instance
 
-    def to_representation(self, instance):
-        return ReadRecipeSerializer(instance, context=self.context).data
+        self.update_ingredients(ingredients, instance)
+        self.update_tags(tags, instance)
+        return instance
 
 
 class FollowSerializer(CustomUserSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.ReadOnlyField(source="recipes.count")
 
     class Meta(CustomUserSerializer.Meta):
         fields = CustomUserSerializer.Meta.fields + (
             "recipes",
             "recipes_count",
+            "followers_count",
         )
         read_only_fields = ("email", "username", "first_name",
                             "last_name", 'is_subscribed')
 
+    def get_is_subscribed(self, obj):
+        return True
+
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        recipes = obj.recipes.all()
-        recipes_limit = request.query_params.get('recipes_limit')
-        if recipes_limit:
-            recipes = recipes[: int(recipes_limit)]
-        return BaseRecipeSerializer(recipes, many=True).data
+        return BaseRecipeSerializer(
+            obj.recipes.all(), many=True, context=self.context).data
+
+
+class RecipesLimitSerializer(serializers.Serializer):
+    recipes_limit = serializers.IntegerField(min_value=0, required=False)
 
 
 class FollowCreateSerializer(serializers.ModelSerializer):
@@ -283,8 +592,3 @@ class FollowCreateSerializer(serializers.ModelSerializer):
                 "Нельзя подписаться на самого себя).",
             )
         return data
-
-    def to_representation(self, instance):
-        return FollowSerializer(
-            instance.author, context=self.context
-        ).data
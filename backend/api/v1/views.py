@@ -1,10 +1,17 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+import hashlib
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Prefetch, Subquery
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import (
     AllowAny,
     IsAuthenticated,
@@ -14,27 +21,42 @@ from rest_framework.permissions import (
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
+from foodgram import counters, shopping_list
+from foodgram.ingredient_index import get_index
+from foodgram.memberships import Memberships
+from foodgram.tag_registry import get_tag_registry
 from foodgram.models import (
     Favorite,
     Ingredient,
-    RecipeIngredient,
     Recipe,
     ShoppingCart,
+    ShoppingListItem,
     Tag,
 )
 from user.models import User
-from .filters import RecipeFilter, IngredientSearch
-from .paginations import LimitNumberPagination
+from .caching import ResponseCacheMixin
+from .filters import RecipeFilter
+from .paginations import RecipePagination, SubscriptionPagination
 from .permissions import IsAuthorOrOnlyRead
+from .renderers import (
+    ShoppingListCSVRenderer,
+    ShoppingListJSONRenderer,
+    ShoppingListTextRenderer,
+)
 from .serializers import (
     CreateRecipeSerializer,
     CustomUserSerializer,
+    FastReadRecipeSerializer,
     FavoriteOrShoppingRecipeSerializer,
+    IngredientSearchSerializer,
     IngredientSerializer,
     ReadRecipeSerializer,
+    RecipeImageSerializer,
+    ShoppingListItemSerializer,
     TagSerializer,
     FollowSerializer,
     FollowCreateSerializer,
+    RecipesLimitSerializer,
 )
 
 
@@ -50,15 +72,29 @@ class CustomUserViewSet(UserViewSet):
             return (AllowAny(),)
         return super().get_permissions()
 
+    def get_subscriptions(self):
+        serializer = RecipesLimitSerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        recipes_limit = serializer.validated_data.get("recipes_limit")
+
+        recipes = Recipe.objects.all()
+        if recipes_limit is not None:
+            recipes = recipes.filter(pk__in=Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef("author")
+                ).values("pk")[:recipes_limit]
+            ))
+        return User.objects.filter(
+            follow__user=self.request.user
+        ).order_by("id").prefetch_related(
+            Prefetch("recipes", queryset=recipes)
+        )
+
     @action(detail=False, methods=["get"],
             permission_classes=[IsAuthenticated],
-            pagination_class=LimitNumberPagination)
+            pagination_class=SubscriptionPagination)
     def subscriptions(self, request):
-        subscriptions = User.objects.filter(follow__user=request.user)
-        if subscriptions is None:
-            return Response('Вы еще ни на кого не подписались.',
-                            status=status.HTTP_400_BAD_REQUEST)
-        pages = self.paginate_queryset(subscriptions)
+        pages = self.paginate_queryset(self.get_subscriptions())
         serializer = FollowSerializer(pages, many=True,
                                       context={'request': request})
         return self.get_paginated_response(serializer.data)
@@ -70,18 +106,27 @@ class CustomUserViewSet(UserViewSet):
     def subscribe(self, request, id=None):
         author = get_object_or_404(User, id=id)
         if request.method == 'POST':
+            subscriptions = self.get_subscriptions()
             serializer = FollowCreateSerializer(
                 data={"user": request.user.id, "author": id},
                 context={"request": request}
             )
             serializer.is_valid(raise_exception=True)
-            serializer.save()
+            with transaction.atomic():
+                serializer.save()
+                counters.update(User, author.pk, "followers_count", 1)
+            serializer = FollowSerializer(subscriptions.get(pk=author.pk),
+                                          context={"request": request})
             return Response(serializer.data,
                             status=status.HTTP_201_CREATED)
 
         if request.method == "DELETE":
-            if request.user.follower.filter(author=author).exists():
-                request.user.follower.filter(author=author).delete()
+            with transaction.atomic():
+                deleted, _ = request.user.follower.filter(
+                    author=author).delete()
+                if deleted:
+                    counters.update(User, author.pk, "followers_count", -1)
+            if deleted:
                 return Response(
                     "Вы отписались от пользователя.",
                     status=status.HTTP_204_NO_CONTENT
@@ -100,33 +145,106 @@ class CustomUserViewSet(UserViewSet):
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = (IngredientSearch,)
-    search_fields = ("^name",)
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        search = IngredientSearchSerializer(data=request.query_params)
+        search.is_valid(raise_exception=True)
+        ingredients = get_index().search(
+            search.validated_data.get("name", ""),
+            search.validated_data.get("limit"),
+        )
+        serializer = self.get_serializer(ingredients, many=True)
+        return Response(serializer.data)
+
 
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
 
+    def registry_response(self, registry, instance, many=False):
+        etag = f'"tags-{registry.version}"'
+        last_modified = registry.version // 1000
+        response = get_conditional_response(
+            self.request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = Response(
+                self.get_serializer(instance, many=many).data)
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        return response
 
-class RecipeViewSet(ModelViewSet):
-    queryset = Recipe.objects.select_related("author").prefetch_related(
-        "tags", "ingredients"
-    )
+    def list(self, request, *args, **kwargs):
+        registry = get_tag_registry()
+        return self.registry_response(registry, registry.tags, many=True)
+
+    def retrieve(self, request, *args, **kwargs):
+        registry = get_tag_registry()
+        pk = self.kwargs["pk"]
+        tag = registry.by_id.get(int(pk)) if pk.isdigit() else None
+        if tag is None:
+            raise Http404
+        return self.registry_response(registry, tag)
+
+
+class RecipeViewSet(ResponseCacheMixin, ModelViewSet):
+    queryset = Recipe.objects.with_related()
     permission_classes = [IsAuthorOrOnlyRead, ]
     filter_backends = (DjangoFilterBackend,)
     http_method_names = ("get", "post", "patch", "head", "delete")
     filterset_class = RecipeFilter
     ordering_fields = ["name", "created", "author"]
-    pagination_class = LimitNumberPagination
+    pagination_class = RecipePagination
+    cache_version = "recipes"
+    private_query_params = RecipePagination.private_query_params
+
+    def use_fast_serializer(self):
+        return (settings.RECIPE_FAST_SERIALIZER
+                and self.action in ("list", "retrieve"))
+
+    def get_queryset(self):
+        queryset = super().get_queryset().with_user_flags(self.request.user)
+        if self.use_fast_serializer():
+            return queryset.prefetch_related(None).values(
+                *FastReadRecipeSerializer.fields)
+        return queryset
+
+    def personalize(self, data):
+        memberships = Memberships(self.request.user)
+        for recipe in data["results"] if "results" in data else [data]:
+            recipe["is_favorited"] = memberships("favorites", recipe["id"])
+            recipe["is_in_shopping_cart"] = memberships(
+                "shopping_cart", recipe["id"])
+            recipe["author"]["is_subscribed"] = memberships(
+                "following", recipe["author"]["id"])
+        return data
 
     def get_serializer_class(self):
+        if self.use_fast_serializer():
+            return FastReadRecipeSerializer
         if self.request.method in SAFE_METHODS:
             return ReadRecipeSerializer
+        if self.action == "image":
+            return RecipeImageSerializer
         return CreateRecipeSerializer
 
+    @action(detail=True, methods=("patch",),
+            parser_classes=(MultiPartParser,))
+    def image(self, request, pk=None):
+        serializer = self.get_serializer(
+            self.get_object(), data={"image": request.data.get("image")},
+            partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        shopping_list.withdraw_recipe(instance)
+        instance.delete()
+        counters.update(User, instance.author_id, "recipes_count", -1)
+
     @action(
         detail=True, permission_classes=(IsAuthenticated,),
         methods=("post", "delete")
@@ -142,8 +260,11 @@ class RecipeViewSet(ModelViewSet):
                     "Такого рецепта не существует.",
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            favorite, created = Favorite.objects.get_or_create(
-                user=user, recipe=recipe)
+            with transaction.atomic():
+                favorite, created = Favorite.objects.get_or_create(
+                    user=user, recipe=recipe)
+                if created:
+                    counters.update(Recipe, recipe.pk, "favorites_count", 1)
             if not created:
                 return Response(
                     "Рецепт уже добавлен в избранное.",
@@ -155,8 +276,10 @@ class RecipeViewSet(ModelViewSet):
         elif request.method == "DELETE":
             recipe = get_object_or_404(Recipe, pk=pk)
             try:
-                favorite = Favorite.objects.get(user=user, recipe=recipe)
-                favorite.delete()
+                with transaction.atomic():
+                    favorite = Favorite.objects.get(user=user, recipe=recipe)
+                    favorite.delete()
+                    counters.update(Recipe, recipe.pk, "favorites_count", -1)
                 return Response(
                     "Удалили рецепт из избранного",
                     status=status.HTTP_204_NO_CONTENT
@@ -183,8 +306,13 @@ class RecipeViewSet(ModelViewSet):
                     "Такого рецепта не существует.",
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            cart, created = ShoppingCart.objects.get_or_create(
-                user=user, recipe=recipe)
+            with transaction.atomic():
+                cart, created = ShoppingCart.objects.get_or_create(
+                    user=user, recipe=recipe)
+                if created:
+                    shopping_list.add_recipe(user, recipe)
+                    counters.update(
+                        Recipe, recipe.pk, "shopping_cart_count", 1)
             if not created:
                 return Response(
                     "Рецепт уже добавлен в корзину.",
@@ -196,8 +324,12 @@ class RecipeViewSet(ModelViewSet):
         elif request.method == "DELETE":
             recipe = get_object_or_404(Recipe, pk=pk)
             try:
-                cart = ShoppingCart.objects.get(user=user, recipe=recipe)
-                cart.delete()
+                with transaction.atomic():
+                    cart = ShoppingCart.objects.get(user=user, recipe=recipe)
+                    cart.delete()
+                    shopping_list.remove_recipe(user, recipe)
+                    counters.update(
+                        Recipe, recipe.pk, "shopping_cart_count", -1)
                 return Response(
                     "Рецепт удален из корзины.",
                     status=status.HTTP_204_NO_CONTENT,
@@ -210,22 +342,41 @@ class RecipeViewSet(ModelViewSet):
 
     @action(detail=False,
             permission_classes=(IsAuthenticated,),
-            methods=("get",))
+            methods=("get",),
+            renderer_classes=(ShoppingListTextRenderer,
+                              ShoppingListCSVRenderer,
+                              ShoppingListJSONRenderer))
     def download_shopping_cart(self, request):
-        ingredients = (
-            RecipeIngredient.objects.select_related("recipe", "ingredient")
-            .filter(recipe__shopping_recipe__user=request.user)
-            .values_list("ingredient__name", "ingredient__measurement_unit")
-            .annotate(amount=Sum("amount"))
+        renderer = request.accepted_renderer
+        fingerprint = hashlib.md5(renderer.format.encode())
+        ingredients = []
+        for row in ShoppingListItem.objects.filter(
+            user=request.user
+        ).order_by("ingredient__name", "ingredient_id").values_list(
+            "ingredient__name", "ingredient__measurement_unit", "amount"
+        ).iterator():
+            fingerprint.update(repr(row).encode())
+            ingredients.append(row)
+        etag = f'"{fingerprint.hexdigest()}"'
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified["ETag"] = etag
+            return not_modified
+
+        response_object = StreamingHttpResponse(
+            renderer.stream(ingredients),
+            content_type=f"{renderer.media_type}; charset=utf-8",
         )
-        response_object = HttpResponse(content_type="text/plain")
         response_object["Content-Disposition"] = (
-            "attachment; filename=ingredients.txt")
-
-        for ingredient, measurement_unit, amount in ingredients:
-            response_object.write(
-                f"Ингредиент: {ingredient},"
-                f"Единица измерения: {measurement_unit},"
-                f"Количество: {amount}\n"
-            )
+            f"attachment; filename=ingredients.{renderer.format}")
+        response_object["ETag"] = etag
         return response_object
+
+    @action(detail=False,
+            permission_classes=(IsAuthenticated,),
+            methods=("get",))
+    def shopping_cart_summary(self, request):
+        ingredients = ShoppingListItem.objects.filter(
+            user=request.user).select_related("ingredient")
+        serializer = ShoppingListItemSerializer(ingredients, many=True)
+        return Response(serializer.data)
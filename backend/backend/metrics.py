@@ -0,0 +1,176 @@
+import atexit
+import bisect
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+HISTOGRAMS = {
+    'foodgram_request_duration_seconds': (
+        'request latency per view action', LATENCY_BUCKETS),
+    'foodgram_response_size_bytes': (
+        'response body size per view action', SIZE_BUCKETS),
+    'foodgram_db_queries': (
+        'sql statements per request', QUERY_BUCKETS),
+    'foodgram_db_duration_seconds': (
+        'time spent in the database per request', LATENCY_BUCKETS),
+}
+COUNTERS = {
+    'foodgram_response_cache_total': 'response cache lookups per result',
+}
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.flushed = 0.0
+        self.pid = None
+        self.started = None
+
+    def observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        with self.lock:
+            sample = self.samples.get((name, labels))
+            if sample is None:
+                sample = self.samples[name, labels] = [0] * (
+                    len(buckets) + 3)
+            sample[bisect.bisect_left(buckets, value)] += 1
+            sample[-2] += value
+            sample[-1] += 1
+
+    def increment(self, name, labels, amount=1):
+        with self.lock:
+            sample = self.samples.setdefault((name, labels), [0])
+            sample[0] += amount
+
+    def path(self):
+        pid = os.getpid()
+        if self.pid != pid:
+            self.pid, self.started = pid, time.time_ns()
+        return os.path.join(
+            settings.METRICS_DIR, f'{pid}-{self.started}.json')
+
+    def flush(self, force=False):
+        if not settings.METRICS_DIR:
+            return
+        with self.lock:
+            now = time.monotonic()
+            if (not force and now - self.flushed
+                    < settings.METRICS_FLUSH_INTERVAL):
+                return
+            self.flushed = now
+            payload = json.dumps([
+                [name, labels, sample]
+                for (name, labels), sample in self.samples.items()
+            ])
+            try:
+                self.write(payload)
+            except OSError as error:
+                logger.warning(
+                    'Не удалось сохранить метрики в %s: %s',
+                    settings.METRICS_DIR, error)
+
+    def write(self, payload):
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(
+            suffix='.tmp', dir=settings.METRICS_DIR)
+        try:
+            with os.fdopen(descriptor, 'w') as file:
+                file.write(payload)
+            os.replace(temporary, self.path())
+        except OSError:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+            raise
+
+    def collect(self):
+        with self.lock:
+            merged = {
+                key: list(sample) for key, sample in self.samples.items()
+            }
+        if not settings.METRICS_DIR or not os.path.isdir(
+                settings.METRICS_DIR):
+            return merged
+        own = os.path.basename(self.path())
+        for filename in os.listdir(settings.METRICS_DIR):
+            if not filename.endswith('.json') or filename == own:
+                continue
+            try:
+                with open(os.path.join(settings.METRICS_DIR, filename)) as f:
+                    rows = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, labels, sample in rows:
+                key = (name, tuple(map(tuple, labels)))
+                if key not in merged:
+                    merged[key] = sample
+                else:
+                    merged[key] = [
+                        left + right
+                        for left, right in zip(merged[key], sample)
+                    ]
+        return merged
+
+    def render(self):
+        samples = self.collect()
+        lines = []
+        for name, (description, buckets) in HISTOGRAMS.items():
+            lines += [f'# HELP {name} {description}',
+                      f'# TYPE {name} histogram']
+            for (metric, labels), sample in sorted(samples.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + ('+Inf',), sample):
+                    cumulative += count
+                    bucket_labels = labels + (('le', str(bound)),)
+                    lines.append(
+                        f'{name}_bucket{format_labels(bucket_labels)} '
+                        f'{cumulative}')
+                lines.append(f'{name}_sum{format_labels(labels)} '
+                             f'{sample[-2]}')
+                lines.append(f'{name}_count{format_labels(labels)} '
+                             f'{sample[-1]}')
+        for name, description in COUNTERS.items():
+            lines += [f'# HELP {name} {description}',
+                      f'# TYPE {name} counter']
+            lines += [
+                f'{name}{format_labels(labels)} {sample[0]}'
+                for (metric, labels), sample in sorted(samples.items())
+                if metric == name
+            ]
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', r'\\').replace(
+            '"', r'\"').replace('\n', r'\n'))
+        for key, value in labels
+    )
+    return f'{{{pairs}}}'
+
+
+registry = Registry()
+atexit.register(registry.flush, force=True)
+
+
+def metrics_view(request):
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,201 @@
+import cProfile
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+NORMALIZATION = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+def fingerprint(sql):
+    for pattern, replacement in NORMALIZATION:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+class RepeatedQueryError(Exception):
+    pass
+
+
+class QueryRecorder:
+    def __init__(self, max_repeats=0):
+        self.max_repeats = max_repeats
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        statement = fingerprint(sql)
+        self.fingerprints[statement] += 1
+        self.count += 1
+        repeats = self.fingerprints[statement]
+        if self.max_repeats and repeats > self.max_repeats:
+            raise RepeatedQueryError(
+                f'Запрос выполнен больше {self.max_repeats} раз: {statement}')
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+
+    def repeated(self, limit=3):
+        return [
+            (statement, count)
+            for statement, count in self.fingerprints.most_common(limit)
+            if count > 1
+        ]
+
+
+class SQLInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder(settings.SQL_MAX_REPEATED_QUERIES)
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+        request.sql_recorder = recorder
+
+        response['Server-Timing'] = (
+            f'db;dur={recorder.duration * 1000:.1f};'
+            f'desc="{recorder.count} queries", '
+            f'total;dur={elapsed * 1000:.1f}'
+        )
+        if (recorder.count > settings.SLOW_REQUEST_QUERIES
+                or elapsed * 1000 > settings.SLOW_REQUEST_MS):
+            logger.warning(
+                'Медленный запрос %s %s: %d SQL-запросов, БД %.1f мс, '
+                'всего %.1f мс, повторы: %s',
+                request.method, request.get_full_path(), recorder.count,
+                recorder.duration * 1000, elapsed * 1000,
+                recorder.repeated() or '-',
+            )
+        return response
+
+
+def action_labels(request):
+    match = request.resolver_match
+    view = getattr(match, 'func', None)
+    view_class = getattr(view, 'cls', None)
+    if view_class is None:
+        return None
+    actions = getattr(view, 'actions', None) or {}
+    method = request.method.lower()
+    return (
+        ('view', view_class.__name__),
+        ('action', actions.get(method, method)),
+    )
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+        labels = action_labels(request)
+        if labels is None:
+            return response
+
+        registry.observe(
+            'foodgram_request_duration_seconds',
+            labels + (('status', str(response.status_code)),), elapsed)
+        if not response.streaming:
+            registry.observe(
+                'foodgram_response_size_bytes', labels, len(response.content))
+        recorder = getattr(request, 'sql_recorder', None)
+        if recorder is not None:
+            registry.observe('foodgram_db_queries', labels, recorder.count)
+            registry.observe(
+                'foodgram_db_duration_seconds', labels, recorder.duration)
+        if response.has_header('X-Cache'):
+            registry.increment(
+                'foodgram_response_cache_total',
+                labels + (('result', response['X-Cache'].lower()),))
+        registry.flush()
+        return response
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def reason(self, request):
+        if not settings.PROFILING_DIR:
+            return None
+        token = request.headers.get(settings.PROFILING_HEADER)
+        if token and settings.PROFILING_SECRET and hmac.compare_digest(
+                token.encode(), settings.PROFILING_SECRET.encode()):
+            return 'header'
+        if random.random() < settings.PROFILING_SAMPLE_RATE:
+            return 'sampled'
+        return None
+
+    def __call__(self, request):
+        reason = self.reason(request)
+        if reason is None:
+            return self.get_response(request)
+
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            profile.enable()
+        except ValueError:
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            profile.disable()
+        elapsed = time.perf_counter() - start
+
+        user = getattr(request, 'user', None)
+        labels = dict(action_labels(request) or (
+            ('view', ''), ('action', request.method.lower())))
+        recorder = getattr(request, 'sql_recorder', QueryRecorder())
+        name = (f'{time.strftime("%Y%m%dT%H%M%S")}-{os.getpid()}-'
+                f'{uuid.uuid4().hex[:8]}')
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        path = os.path.join(settings.PROFILING_DIR, name)
+        profile.dump_stats(f'{path}.prof')
+        with open(f'{path}.json', 'w') as file:
+            json.dump({
+                'method': request.method,
+                'path': request.get_full_path(),
+                'view': labels['view'],
+                'action': labels['action'],
+                'status': response.status_code,
+                'duration_ms': round(elapsed * 1000, 3),
+                'queries': recorder.count,
+                'db_ms': round(recorder.duration * 1000, 3),
+                'user': user.pk if user and user.is_authenticated else None,
+                'reason': reason,
+                'created': time.time(),
+            }, file)
+        if reason == 'header':
+            response['X-Profile-Id'] = name
+        return response
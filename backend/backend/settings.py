@@ -31,6 +31,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'backend.middleware.MetricsMiddleware',
+    'backend.middleware.ProfilingMiddleware',
+    'backend.middleware.SQLInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -72,6 +75,14 @@ DATABASES = {
     }
 }
 
+if os.getenv('DB_ENGINE', 'postgresql') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -108,11 +119,55 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+RECIPE_IMAGE_MAX_BYTES = int(
+    os.getenv('RECIPE_IMAGE_MAX_BYTES', 10 * 1024 * 1024))
+
+RECIPE_IMAGE_MAX_PIXELS = int(os.getenv('RECIPE_IMAGE_MAX_PIXELS', 4096 * 4096))
+
+RECIPE_IMAGE_RENDITION_WIDTHS = (320, 960)
+
+RECIPE_IMAGE_RENDITION_WORKERS = int(
+    os.getenv('RECIPE_IMAGE_RENDITION_WORKERS', 2))
+
+
+# Version stamps, cached responses and per-user memberships are shared
+# between processes only through the cache. LocMemCache is private to one
+# process, which is fine for the single gunicorn worker the image runs. With
+# several workers (WEB_CONCURRENCY) or containers set CACHE_BACKEND to Redis
+# or Memcached; `check` fails otherwise.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+SHARED_CACHE = not CACHES['default']['BACKEND'].endswith('.LocMemCache')
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 1))
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'user.User'
 
+RECIPE_FAST_SERIALIZER = os.getenv(
+    'RECIPE_FAST_SERIALIZER', 'False').lower() == 'true'
+RESPONSE_CACHE_TIMEOUT = int(
+    os.getenv('RESPONSE_CACHE_TIMEOUT', 5 * 60))
+MEMBERSHIP_CACHE_TIMEOUT = int(
+    os.getenv('MEMBERSHIP_CACHE_TIMEOUT', 60 * 60))
+PAGINATION_COUNT_CACHE_TIMEOUT = int(
+    os.getenv('PAGINATION_COUNT_CACHE_TIMEOUT', 60 * 60))
+PAGINATION_COUNT_ESTIMATE_MIN = int(
+    os.getenv('PAGINATION_COUNT_ESTIMATE_MIN', 100_000))
+SLOW_REQUEST_QUERIES = int(os.getenv('SLOW_REQUEST_QUERIES', 50))
+SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', 500))
+SQL_MAX_REPEATED_QUERIES = int(os.getenv('SQL_MAX_REPEATED_QUERIES', 0))
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+PROFILING_DIR = os.getenv('PROFILING_DIR', '')
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_HEADER = 'X-Profile'
+PROFILING_SECRET = os.getenv('PROFILING_SECRET', '')
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
@@ -121,7 +176,7 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.TokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS':
-        'rest_framework.pagination.LimitOffsetPagination',
+        'api.v1.paginations.CountedLimitOffsetPagination',
     'PAGE_SIZE': 6,
 }
 
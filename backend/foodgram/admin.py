@@ -23,7 +23,8 @@ class TagInline(admin.TabularInline):
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     list_display = ("name", "ingredients", "author",
-                    'tags', 'cooking_time', 'text')
+                    'tags', 'cooking_time', 'text', 'favorites_count',
+                    'shopping_cart_count')
     inlines = (IngredientsInline,)
     search_fields = ['name', 'author']
     list_filter = ['tags', 'author']
@@ -49,7 +50,10 @@ class IngredientAdmin(admin.ModelAdmin):
     search_fields = ['name']
 
 
-admin.site.register(User, UserAdmin)
+@admin.register(User)
+class CustomUserAdmin(UserAdmin):
+    list_display = UserAdmin.list_display + (
+        'recipes_count', 'followers_count')
 
 
 @admin.register(Favorite)
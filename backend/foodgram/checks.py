@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    # Every cache built on foodgram.versions (cached responses, memberships,
+    # pagination counts, the tag registry and the ingredient index) notices
+    # writes only through version stamps stored in the default cache.
+    if settings.SHARED_CACHE or settings.WEB_CONCURRENCY <= 1:
+        return []
+    return [
+        Error(
+            'Version stamps are kept in a process-local cache backend with '
+            f'{settings.WEB_CONCURRENCY} workers, the other workers would '
+            'keep serving stale responses, memberships, pagination counts, '
+            'tags and ingredients.',
+            hint='Set CACHE_BACKEND to a shared cache such as Redis or '
+                 'Memcached, or run a single worker.',
+            id='foodgram.E001',
+        )
+    ]
@@ -9,3 +9,5 @@ LENTH_TAG_FIELD = 100
 LENTH_TEXT_FIELD = 200
 
 USERNAME_MAX_LENGTH = 150
+
+MAX_TAG_BITS = 63
@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Favorite, Follow, Recipe, ShoppingCart
+
+User = get_user_model()
+
+COUNTERS = {
+    Recipe: {
+        'favorites_count': (Favorite, 'recipe'),
+        'shopping_cart_count': (ShoppingCart, 'recipe'),
+    },
+    User: {
+        'recipes_count': (Recipe, 'author'),
+        'followers_count': (Follow, 'author'),
+    },
+}
+
+
+def update(model, pk, field, delta):
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, Value(0))})
+
+
+def counted(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by()
+        .values(field).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def reconcile(model, pks, fix=True):
+    counters = COUNTERS[model]
+    rows = model.objects.filter(pk__in=pks).select_for_update().only(
+        'pk', *counters
+    ).annotate(**{
+        f'actual_{field}': counted(*source)
+        for field, source in counters.items()
+    })
+    stale, drifted = [], 0
+    for row in rows:
+        changed = [
+            field for field in counters
+            if getattr(row, field) != getattr(row, f'actual_{field}')
+        ]
+        for field in changed:
+            setattr(row, field, getattr(row, f'actual_{field}'))
+        if changed:
+            stale.append(row)
+            drifted += len(changed)
+    if fix:
+        model.objects.bulk_update(stale, list(counters))
+    return drifted
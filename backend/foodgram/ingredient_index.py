@@ -0,0 +1,40 @@
+import bisect
+
+from .models import Ingredient
+from .versions import Versioned
+
+MAX_CHAR = '\U0010ffff'
+
+
+class IngredientIndex:
+    def __init__(self, ingredients):
+        self.entries = sorted(
+            ((ingredient.name.lower(), ingredient.name, ingredient.pk,
+              ingredient) for ingredient in ingredients),
+            key=lambda entry: entry[:3],
+        )
+        self.keys = [entry[0] for entry in self.entries]
+
+    def search(self, query, limit=None):
+        query = query.lower()
+        start = bisect.bisect_left(self.keys, query)
+        end = bisect.bisect_right(self.keys, query + MAX_CHAR, lo=start)
+        if limit is not None:
+            end = min(end, start + limit)
+        found = [entry[-1] for entry in self.entries[start:end]]
+        if query and (limit is None or len(found) < limit):
+            found.extend(
+                entry[-1] for entry in self.entries
+                if query in entry[0] and not entry[0].startswith(query)
+            )
+        return found[:limit]
+
+
+_index = Versioned(
+    'ingredients',
+    lambda version: IngredientIndex(Ingredient.objects.all()),
+)
+
+
+def get_index():
+    return _index.get()
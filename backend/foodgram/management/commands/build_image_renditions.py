@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from foodgram.models import Recipe
+from foodgram.renditions import build_renditions, rendition_names
+
+
+def is_missing(image_name):
+    return any(
+        not default_storage.exists(name)
+        for names in rendition_names(image_name).values()
+        for name in names.values()
+    )
+
+
+class Command(BaseCommand):
+    help = 'build thumbnail and webp renditions for recipe images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument(
+            '--force', action='store_true',
+            help='rebuild renditions that already exist')
+
+    def build(self, image_name):
+        try:
+            build_renditions(image_name)
+        except Exception as error:
+            return f'{image_name}: {error}'
+        return None
+
+    def handle(self, *args, **options):
+        images = Recipe.objects.exclude(image='').order_by().values_list(
+            'image', flat=True).distinct().iterator()
+        if not options['force']:
+            images = (name for name in images if is_missing(name))
+
+        built, errors = 0, []
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            for error in executor.map(self.build, images):
+                if error is None:
+                    built += 1
+                else:
+                    errors.append(error)
+
+        for error in errors:
+            self.stderr.write(error)
+        self.stdout.write(
+            f'{built} images processed, {len(errors)} failed')
@@ -0,0 +1,81 @@
+import time
+from contextlib import nullcontext
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from foodgram import synthetic
+
+
+class Command(BaseCommand):
+    help = ('fill the database with a reproducible synthetic dataset with '
+            'skewed author, recipe and ingredient popularity')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--recipes', type=int, default=100_000)
+        parser.add_argument('--ingredients', type=int, default=2_000)
+        parser.add_argument('--tags', type=int, default=12)
+        parser.add_argument(
+            '--favorites', type=int, default=50,
+            help='favorite recipes per user')
+        parser.add_argument(
+            '--carts', type=int, default=5,
+            help='recipes in the shopping cart per user')
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='followed authors per user')
+        parser.add_argument(
+            '--ingredients-per-recipe', type=int, nargs=2, default=(3, 12),
+            metavar=('MIN', 'MAX'))
+        parser.add_argument(
+            '--skew', type=float, default=1.0,
+            help='zipf exponent of popularity, 0 for uniform')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='synthetic')
+        parser.add_argument('--password', default='synthetic-password')
+        parser.add_argument('--batch-size', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        for option in ('users', 'recipes', 'ingredients', 'tags'):
+            if options[option] < 1:
+                raise CommandError(f'--{option} must be positive')
+        low, high = options['ingredients_per_recipe']
+        if not 1 <= low <= high:
+            raise CommandError('invalid --ingredients-per-recipe range')
+        existing = [
+            model._meta.label
+            for model, lookup in synthetic.prefixed(options['prefix']).items()
+            if model.objects.filter(**lookup).exists()
+        ]
+        if existing:
+            raise CommandError(
+                f'data with prefix {options["prefix"]!r} already exists in '
+                f'{", ".join(existing)}, choose another --prefix')
+
+        start = time.perf_counter()
+
+        def log(message):
+            self.stdout.write(
+                f'{time.perf_counter() - start:8.1f} s  {message}')
+
+        atomic = (nullcontext() if connection.vendor == 'postgresql'
+                  else transaction.atomic())
+        try:
+            with atomic:
+                synthetic.generate(
+                    users=options['users'], recipes=options['recipes'],
+                    ingredients=options['ingredients'], tags=options['tags'],
+                    favorites=options['favorites'], carts=options['carts'],
+                    follows=options['follows'],
+                    ingredients_per_recipe=(low, high),
+                    skew=options['skew'], seed=options['seed'],
+                    prefix=options['prefix'], password=options['password'],
+                    batch_size=options['batch_size'], log=log,
+                )
+        except ValidationError as error:
+            raise CommandError(' '.join(error.messages))
+        self.stdout.write(self.style.SUCCESS(
+            f'generated in {time.perf_counter() - start:.1f} s on '
+            f'{connection.vendor}'))
@@ -0,0 +1,151 @@
+import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from foodgram.models import Ingredient, Tag
+from foodgram.versions import bump_on_commit
+
+DATA_DIR = settings.BASE_DIR / 'data'
+CATALOGUES = {
+    'ingredients': {
+        'model': Ingredient,
+        'key': ('name', 'measurement_unit'),
+        'fields': (),
+        'path': DATA_DIR / 'ingredients.csv',
+    },
+    'tags': {
+        'model': Tag,
+        'key': ('slug',),
+        'fields': ('name', 'color'),
+        'path': DATA_DIR / 'recipes_tag.csv',
+        'prepare': Tag.objects.assign_bits,
+    },
+}
+
+
+def read_json_array(file, chunk_size=64 * 1024):
+    decoder = json.JSONDecoder()
+    buffer, opened = '', False
+    while True:
+        buffer = buffer.lstrip()
+        if opened:
+            buffer = buffer.lstrip(',').lstrip()
+        if not buffer:
+            buffer = file.read(chunk_size)
+            if not buffer:
+                raise CommandError('unexpected end of json array')
+            continue
+        if not opened:
+            if buffer[0] != '[':
+                raise CommandError('expected a json array')
+            buffer, opened = buffer[1:], True
+            continue
+        if buffer[0] == ']':
+            return
+        try:
+            row, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise CommandError('invalid json array')
+            buffer += chunk
+            continue
+        yield row
+        buffer = buffer[end:]
+
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8') as file:
+        if path.suffix == '.csv':
+            yield from csv.DictReader(file, delimiter=',')
+        elif path.suffix == '.jsonl':
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        elif path.suffix == '.json':
+            yield from read_json_array(file)
+        else:
+            raise CommandError(f'unsupported file format: {path.suffix}')
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'load ingredients or tags from csv/json, skipping existing rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('catalogue', choices=CATALOGUES)
+        parser.add_argument('path', nargs='?')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def load_batch(self, catalogue, rows):
+        model, key = catalogue['model'], catalogue['key']
+        fields = key + catalogue['fields']
+        rows = {
+            tuple(row[field] for field in key): {
+                field: row[field] for field in fields}
+            for row in rows
+        }
+        existing = {
+            tuple(getattr(obj, field) for field in key): obj
+            for obj in model.objects.filter(**{
+                f'{field}__in': {values[field] for values in rows.values()}
+                for field in key
+            })
+        }
+
+        to_create, to_update = [], []
+        for row_key, values in rows.items():
+            obj = existing.get(row_key)
+            if obj is None:
+                to_create.append(model(**values))
+            elif any(getattr(obj, field) != values[field]
+                     for field in catalogue['fields']):
+                for field in catalogue['fields']:
+                    setattr(obj, field, values[field])
+                to_update.append(obj)
+        if 'prepare' in catalogue:
+            catalogue['prepare'](to_create)
+        model.objects.bulk_create(to_create)
+        if to_update:
+            model.objects.bulk_update(to_update, catalogue['fields'])
+        return len(to_create), len(to_update)
+
+    def handle(self, *args, **options):
+        catalogue = CATALOGUES[options['catalogue']]
+        path = Path(options['path'] or catalogue['path'])
+        if not path.exists():
+            raise CommandError(f'file not found: {path}')
+
+        start = time.perf_counter()
+        processed, created, updated = 0, 0, 0
+        with transaction.atomic():
+            for batch in batches(read_rows(path), options['batch_size']):
+                batch_created, batch_updated = self.load_batch(
+                    catalogue, batch)
+                processed += len(batch)
+                created += batch_created
+                updated += batch_updated
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'{processed} rows processed')
+            bump_on_commit(options['catalogue'], 'recipes')
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'{options["catalogue"]}: {processed} rows, {created} created, '
+            f'{updated} updated, {processed - created - updated} unchanged '
+            f'in {elapsed:.2f} s ({processed / max(elapsed, 1e-9):.0f} rows/s)'
+        ))
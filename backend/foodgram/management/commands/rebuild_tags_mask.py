@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from foodgram.models import Recipe
+from foodgram.versions import bump_on_commit, counts_version
+
+
+class Command(BaseCommand):
+    help = 'recompute recipe tag masks from recipe tags and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='only report drift, do not fix it')
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.order_by('pk').values_list('pk', flat=True)
+        last_pk, checked, drifted = 0, 0, 0
+        while True:
+            recipe_ids = list(
+                recipes.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not recipe_ids:
+                break
+            with transaction.atomic():
+                drifted += Recipe.objects.filter(
+                    pk__in=recipe_ids
+                ).select_for_update().rebuild_tags_mask(
+                    fix=not options['dry_run'])
+            checked += len(recipe_ids)
+            last_pk = recipe_ids[-1]
+        if drifted and not options['dry_run']:
+            bump_on_commit(counts_version(Recipe))
+
+        self.stdout.write(
+            f'checked {checked} recipes, {drifted} drifted tag masks'
+            + (' (not fixed)' if options['dry_run'] and drifted else ''))
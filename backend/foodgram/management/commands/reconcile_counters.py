@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from foodgram import counters
+from foodgram.versions import bump_on_commit
+
+
+class Command(BaseCommand):
+    help = 'recount denormalized recipe and user counters and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='only report drift, do not fix it')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for model in counters.COUNTERS:
+            pks = model.objects.order_by('pk').values_list('pk', flat=True)
+            last_pk, checked, drifted = 0, 0, 0
+            while True:
+                batch = list(pks.filter(pk__gt=last_pk)[:batch_size])
+                if not batch:
+                    break
+                with transaction.atomic():
+                    drifted += counters.reconcile(
+                        model, batch, fix=not options['dry_run'])
+                checked += len(batch)
+                last_pk = batch[-1]
+            if drifted and not options['dry_run']:
+                bump_on_commit('recipes')
+
+            self.stdout.write(
+                f'checked {checked} {model._meta.label} rows, '
+                f'{drifted} drifted counters'
+                + (' (not fixed)' if options['dry_run'] and drifted else ''))
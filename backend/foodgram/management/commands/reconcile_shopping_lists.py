@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from foodgram import shopping_list
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'rebuild shopping list aggregates from carts and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='only report drift, do not fix it')
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('pk').values_list('pk', flat=True)
+        last_pk, checked, drifted = 0, 0, 0
+        while True:
+            user_ids = list(
+                users.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not user_ids:
+                break
+            drifted += shopping_list.reconcile(
+                user_ids, fix=not options['dry_run'])
+            checked += len(user_ids)
+            last_pk = user_ids[-1]
+
+        self.stdout.write(
+            f'checked {checked} users, {drifted} drifted shopping list items'
+            + (' (not fixed)' if options['dry_run'] and drifted else ''))
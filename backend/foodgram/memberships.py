@@ -0,0 +1,58 @@
+import bisect
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Favorite, Follow, ShoppingCart
+
+KINDS = {
+    'favorites': (Favorite, 'recipe_id'),
+    'shopping_cart': (ShoppingCart, 'recipe_id'),
+    'following': (Follow, 'author_id'),
+}
+
+
+def membership_key(kind, user_id):
+    return f'memberships:{kind}:{user_id}'
+
+
+def load_ids(kind, user_id):
+    model, field = KINDS[kind]
+    return array('q', model.objects.filter(
+        user_id=user_id).order_by(field).values_list(field, flat=True))
+
+
+def get_ids(kind, user_id):
+    if not settings.MEMBERSHIP_CACHE_TIMEOUT:
+        return load_ids(kind, user_id)
+    key = membership_key(kind, user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = load_ids(kind, user_id)
+        cache.set(key, ids, settings.MEMBERSHIP_CACHE_TIMEOUT)
+    return ids
+
+
+def contains(ids, value):
+    index = bisect.bisect_left(ids, value)
+    return index < len(ids) and ids[index] == value
+
+
+def invalidate_on_commit(kind, user_id):
+    key = membership_key(kind, user_id)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+class Memberships:
+    def __init__(self, user):
+        self.user = user
+        self.ids = {}
+
+    def __call__(self, kind, value):
+        if not self.user.is_authenticated:
+            return False
+        if kind not in self.ids:
+            self.ids[kind] = get_ids(kind, self.user.pk)
+        return contains(self.ids[kind], value)
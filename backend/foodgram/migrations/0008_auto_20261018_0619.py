@@ -0,0 +1,41 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:19
+
+from django.db import migrations, models
+from django.db.models import F
+
+MAX_TAG_BITS = 63
+
+
+def fill_tag_masks(apps, schema_editor):
+    Tag = apps.get_model('foodgram', 'Tag')
+    Recipe = apps.get_model('foodgram', 'Recipe')
+    tags = list(Tag.objects.order_by('pk'))
+    if len(tags) > MAX_TAG_BITS:
+        raise RuntimeError(
+            f'{len(tags)} tags do not fit into a {MAX_TAG_BITS}-bit mask')
+    for bit, tag in enumerate(tags):
+        tag.bit = bit
+        Recipe.objects.filter(tags=tag).update(
+            tags_mask=F('tags_mask').bitor(1 << bit))
+    Tag.objects.bulk_update(tags, ['bit'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0007_auto_20261018_0605'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='tags_mask',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False, verbose_name='Маска тегов'),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='bit',
+            field=models.PositiveSmallIntegerField(editable=False, null=True, verbose_name='Бит в маске тегов'),
+        ),
+        migrations.RunPython(fill_tag_masks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:21
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def counted(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by()
+        .values(field).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('foodgram', 'Recipe')
+    Favorite = apps.get_model('foodgram', 'Favorite')
+    ShoppingCart = apps.get_model('foodgram', 'ShoppingCart')
+    Follow = apps.get_model('foodgram', 'Follow')
+    User = apps.get_model('user', 'User')
+    Recipe.objects.update(
+        favorites_count=counted(Favorite, 'recipe'),
+        shopping_cart_count=counted(ShoppingCart, 'recipe'),
+    )
+    User.objects.update(
+        recipes_count=counted(Recipe, 'author'),
+        followers_count=counted(Follow, 'author'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0009_auto_20261018_0620'),
+        ('user', '0005_auto_20261018_0621'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='shopping_cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В корзинах'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,12 @@
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.core.validators import (MaxValueValidator, MinValueValidator,
                                     RegexValidator)
 from django.db import models
+from django.db.models import Exists, OuterRef, Prefetch, Value
 
-from .constants import (MIN_VALUE, MAX_VALUE, LENGTH_XEC_COLOR,
-                        LENTH_TAG_FIELD, LENTH_TEXT_FIELD)
+from .constants import (MIN_VALUE, MAX_VALUE, MAX_TAG_BITS,
+                        LENGTH_XEC_COLOR, LENTH_TAG_FIELD, LENTH_TEXT_FIELD)
 
 
 User = get_user_model()
@@ -28,6 +30,23 @@ class Ingredient(models.Model):
         return f"{self.name}, {self.measurement_unit}"
 
 
+class TagQuerySet(models.QuerySet):
+    def free_bits(self):
+        used = set(self.values_list('bit', flat=True))
+        return (bit for bit in range(MAX_TAG_BITS) if bit not in used)
+
+    def assign_bits(self, tags):
+        tags = [tag for tag in tags if tag.bit is None]
+        if not tags:
+            return
+        free_bits = self.free_bits()
+        for tag in tags:
+            tag.bit = next(free_bits, None)
+            if tag.bit is None:
+                raise ValidationError(
+                    f'Нельзя создать больше {MAX_TAG_BITS} тегов.')
+
+
 class Tag(models.Model):
     name = models.CharField(max_length=LENTH_TAG_FIELD, unique=True,
                             verbose_name="Название")
@@ -44,6 +63,10 @@ class Tag(models.Model):
             )
         ],
     )
+    bit = models.PositiveSmallIntegerField(
+        unique=True, editable=False, verbose_name="Бит в маске тегов")
+
+    objects = TagQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Тег"
@@ -59,6 +82,60 @@ class Tag(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        Tag.objects.assign_bits([self])
+        super().save(*args, **kwargs)
+
+    @property
+    def mask(self):
+        return 1 << self.bit
+
+    @staticmethod
+    def mask_of(tags):
+        mask = 0
+        for tag in tags:
+            mask |= tag.mask
+        return mask
+
+
+class RecipeQuerySet(models.QuerySet):
+    def with_related(self):
+        return self.select_related('author').prefetch_related(
+            Prefetch(
+                'ingredients_for_recipe',
+                queryset=RecipeIngredient.objects.select_related('ingredient'),
+            ),
+            Prefetch('tags', queryset=Tag.objects.only('pk')),
+        )
+
+    def with_user_flags(self, user):
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False, output_field=models.BooleanField()),
+                is_in_shopping_cart=Value(
+                    False, output_field=models.BooleanField()),
+            )
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+        )
+
+    def rebuild_tags_mask(self, fix=True):
+        stored = dict(self.values_list('pk', 'tags_mask'))
+        expected = dict.fromkeys(stored, 0)
+        for recipe_id, bit in Recipe.tags.through.objects.filter(
+                recipe_id__in=stored).values_list('recipe_id', 'tag__bit'):
+            expected[recipe_id] |= 1 << bit
+        stale = [
+            Recipe(pk=pk, tags_mask=mask)
+            for pk, mask in expected.items() if stored[pk] != mask
+        ]
+        if fix:
+            Recipe.objects.bulk_update(stale, ['tags_mask'])
+        return len(stale)
+
 
 class Recipe(models.Model):
     name = models.CharField(max_length=LENTH_TEXT_FIELD,
@@ -87,15 +164,30 @@ class Recipe(models.Model):
     )
     tags = models.ManyToManyField(
         Tag, verbose_name="Теги")
+    tags_mask = models.BigIntegerField(
+        default=0, db_index=True, editable=False,
+        verbose_name="Маска тегов")
+    favorites_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="В избранном")
+    shopping_cart_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="В корзинах")
     created = models.DateTimeField(
         auto_now_add=True, db_index=True, verbose_name="Дата публикации."
     )
 
+    objects = RecipeQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
         default_related_name = 'recipes'
         ordering = ("-created",)
+        indexes = (
+            models.Index(
+                fields=("author", "-created"),
+                name="recipe_author_created_idx",
+            ),
+        )
 
     def __str__(self):
         return f'{self.name}, {self.author}'
@@ -236,3 +328,32 @@ class Favorite(UserRecipeCreated):
             models.UniqueConstraint(
                 fields=["user", "recipe"], name="unique_favorite")
         ]
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name="Пользователь",
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name="Ингредиент",
+    )
+    amount = models.PositiveIntegerField(verbose_name="Количество")
+
+    class Meta:
+        verbose_name = "Позиция списка покупок"
+        verbose_name_plural = "Позиции списков покупок"
+        default_related_name = 'shopping_list'
+        ordering = ("ingredient__name",)
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "ingredient"],
+                name="unique_shopping_list_item"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.ingredient} {self.amount}"
@@ -0,0 +1,79 @@
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpeg', 'JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+)
+
+_lock = threading.Lock()
+_executor = None
+
+
+def rendition_name(image_name, width, extension):
+    directory, filename = os.path.split(image_name)
+    return os.path.join(
+        directory, 'renditions', f'{filename}.{width}.{extension}')
+
+
+def rendition_names(image_name):
+    return {
+        width: {
+            extension: rendition_name(image_name, width, extension)
+            for extension, _, _ in FORMATS
+        }
+        for width in settings.RECIPE_IMAGE_RENDITION_WIDTHS
+    }
+
+
+def build_renditions(image_name):
+    with default_storage.open(image_name) as file, Image.open(file) as image:
+        image = image.convert('RGB')
+        for width, names in rendition_names(image_name).items():
+            rendition = image.copy()
+            rendition.thumbnail((width, width * 4), Image.LANCZOS)
+            for extension, format, options in FORMATS:
+                buffer = io.BytesIO()
+                rendition.save(buffer, format, **options)
+                name = names[extension]
+                default_storage.delete(name)
+                default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def build_renditions_safely(image_name):
+    try:
+        build_renditions(image_name)
+    except Exception:
+        logger.exception('Не удалось построить превью для %s', image_name)
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RECIPE_IMAGE_RENDITION_WORKERS,
+                thread_name_prefix='renditions',
+            )
+    return _executor
+
+
+def schedule_renditions(image_name):
+    if not image_name:
+        return
+    if settings.RECIPE_IMAGE_RENDITION_WORKERS:
+        transaction.on_commit(
+            lambda: get_executor().submit(build_renditions_safely, image_name))
+    else:
+        transaction.on_commit(lambda: build_renditions_safely(image_name))
@@ -0,0 +1,115 @@
+from collections import Counter, defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import RecipeIngredient, ShoppingCart, ShoppingListItem
+
+User = get_user_model()
+
+
+def lock_users(user_ids):
+    return list(User.objects.select_for_update().filter(
+        pk__in=user_ids).order_by("pk").values_list("pk", flat=True))
+
+
+def nonzero(deltas):
+    return {ingredient: delta for ingredient, delta in deltas.items() if delta}
+
+
+def recipe_amounts(recipe):
+    return dict(recipe.ingredients_for_recipe.values_list(
+        "ingredient_id", "amount"))
+
+
+@transaction.atomic
+def apply_changes(changes):
+    changes = {user_id: nonzero(deltas)
+               for user_id, deltas in changes.items() if nonzero(deltas)}
+    if not changes:
+        return
+    lock_users(changes)
+
+    ingredient_ids = set().union(*changes.values())
+    items = {
+        (item.user_id, item.ingredient_id): item
+        for item in ShoppingListItem.objects.filter(
+            user_id__in=changes, ingredient_id__in=ingredient_ids)
+    }
+    to_create, to_update, to_delete = [], [], []
+    for user_id, deltas in changes.items():
+        for ingredient_id, delta in deltas.items():
+            item = items.get((user_id, ingredient_id))
+            if item is None:
+                if delta > 0:
+                    to_create.append(ShoppingListItem(
+                        user_id=user_id, ingredient_id=ingredient_id,
+                        amount=delta))
+            elif item.amount + delta > 0:
+                item.amount += delta
+                to_update.append(item)
+            else:
+                to_delete.append(item.pk)
+
+    ShoppingListItem.objects.bulk_create(to_create)
+    ShoppingListItem.objects.bulk_update(to_update, ["amount"])
+    ShoppingListItem.objects.filter(pk__in=to_delete).delete()
+
+
+def add_recipe(user, recipe):
+    apply_changes({user.pk: recipe_amounts(recipe)})
+
+
+def remove_recipe(user, recipe):
+    apply_changes({user.pk: {
+        ingredient_id: -amount
+        for ingredient_id, amount in recipe_amounts(recipe).items()
+    }})
+
+
+def withdraw_recipe(recipe):
+    change_recipe(recipe, recipe_amounts(recipe), {})
+
+
+def change_recipe(recipe, old_amounts, new_amounts):
+    deltas = Counter(new_amounts)
+    deltas.subtract(old_amounts)
+    if not any(deltas.values()):
+        return
+    user_ids = ShoppingCart.objects.filter(
+        recipe=recipe).values_list("user_id", flat=True)
+    apply_changes({user_id: deltas for user_id in user_ids})
+
+
+def expected_amounts(user_ids):
+    expected = defaultdict(dict)
+    rows = RecipeIngredient.objects.filter(
+        recipe__shopping_recipe__user__in=user_ids
+    ).values_list(
+        "recipe__shopping_recipe__user", "ingredient"
+    ).annotate(amount=Sum("amount")).order_by()
+    for user_id, ingredient_id, amount in rows:
+        expected[user_id][ingredient_id] = amount
+    return expected
+
+
+@transaction.atomic
+def reconcile(user_ids, fix=True):
+    lock_users(user_ids)
+    expected = expected_amounts(user_ids)
+    stored = defaultdict(dict)
+    for user_id, ingredient_id, amount in ShoppingListItem.objects.filter(
+            user_id__in=user_ids).values_list(
+                "user_id", "ingredient_id", "amount"):
+        stored[user_id][ingredient_id] = amount
+
+    changes = {}
+    for user_id in user_ids:
+        deltas = Counter(expected[user_id])
+        deltas.subtract(stored[user_id])
+        if nonzero(deltas):
+            changes[user_id] = nonzero(deltas)
+    if fix:
+        apply_changes(changes)
+    return sum(len(deltas) for deltas in changes.values())
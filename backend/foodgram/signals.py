@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.db.models import F
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from .memberships import invalidate_on_commit
+from .models import (Favorite, Follow, Ingredient, Recipe, RecipeIngredient,
+                     ShoppingCart, Tag)
+from .versions import bump_on_commit, counts_version
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(**kwargs):
+    bump_on_commit('ingredients', 'recipes')
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(**kwargs):
+    bump_on_commit('tags', 'recipes')
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+@receiver((post_save, post_delete), sender=Favorite)
+def recipe_changed(**kwargs):
+    bump_on_commit('recipes')
+
+
+@receiver((post_save, post_delete), sender=settings.AUTH_USER_MODEL)
+def user_changed(update_fields=None, **kwargs):
+    if update_fields != frozenset(('last_login',)):
+        bump_on_commit('recipes')
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleted(instance, **kwargs):
+    Recipe.objects.filter(tags=instance).update(
+        tags_mask=F('tags_mask').bitand(~instance.mask))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        recipes = Recipe.objects.filter(pk=instance.pk)
+    elif action == 'post_clear':
+        recipes = Recipe.objects.annotate(
+            matched_tags=F('tags_mask').bitand(instance.mask)
+        ).exclude(matched_tags=0)
+    else:
+        recipes = Recipe.objects.filter(pk__in=pk_set)
+    recipes.rebuild_tags_mask()
+    bump_on_commit(counts_version(Recipe), 'recipes')
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def row_created(sender, created, **kwargs):
+    if created:
+        bump_on_commit(counts_version(sender))
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def row_deleted(sender, **kwargs):
+    bump_on_commit(counts_version(sender))
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+def favorite_changed(instance, **kwargs):
+    invalidate_on_commit('favorites', instance.user_id)
+
+
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def shopping_cart_changed(instance, **kwargs):
+    invalidate_on_commit('shopping_cart', instance.user_id)
+
+
+@receiver((post_save, post_delete), sender=Follow)
+def follow_changed(instance, **kwargs):
+    invalidate_on_commit('following', instance.user_id)
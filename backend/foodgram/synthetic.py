@@ -0,0 +1,297 @@
+import csv
+import io
+import math
+import random
+import re
+import tempfile
+from array import array
+from bisect import bisect
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from . import shopping_list
+from .models import (Favorite, Follow, Ingredient, Recipe, RecipeIngredient,
+                     ShoppingCart, Tag)
+from .versions import bump_on_commit, counts_version
+
+User = get_user_model()
+
+Dataset = namedtuple(
+    'Dataset', ('users', 'recipes', 'ingredients', 'tags', 'password'))
+
+MEASUREMENT_UNITS = ('г', 'мл', 'шт', 'ст. л.', 'ч. л.', 'по вкусу')
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+@contextmanager
+def test_database(keepdb=False):
+    runner = DiscoverRunner(interactive=False, verbosity=0, keepdb=keepdb)
+    runner.setup_test_environment()
+    databases = runner.setup_databases()
+    try:
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(
+                    MEDIA_ROOT=media_root, RECIPE_IMAGE_RENDITION_WORKERS=0):
+            yield
+    finally:
+        runner.teardown_databases(databases)
+        runner.teardown_test_environment()
+
+
+@contextmanager
+def explicit_created():
+    field = Recipe._meta.get_field('created')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Popularity:
+    def __init__(self, count, skew, rng):
+        self.count = count
+        self.cumulative = array('d', accumulate(
+            1 / (rank + 1) ** skew for rank in range(count)))
+        self.step = rng.randrange(1, count + 1)
+        while math.gcd(self.step, count) != 1:
+            self.step += 1
+        self.offset = rng.randrange(count)
+
+    def pick(self, rng):
+        rank = bisect(self.cumulative, rng.random() * self.cumulative[-1])
+        return (min(rank, self.count - 1) * self.step
+                + self.offset) % self.count
+
+    def sample(self, rng, size, exclude=None):
+        size = min(size, self.count - (exclude is not None))
+        chosen = set()
+        for _ in range(size * 20):
+            if len(chosen) >= size:
+                break
+            chosen.add(self.pick(rng))
+            chosen.discard(exclude)
+        while len(chosen) < size:
+            chosen.add(rng.randrange(self.count))
+            chosen.discard(exclude)
+        return sorted(chosen)
+
+
+def copy_rows(model, fields, rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    quote = connection.ops.quote_name
+    columns = ', '.join(
+        quote(model._meta.get_field(field).column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY {quote(model._meta.db_table)} ({columns}) '
+            f'FROM STDIN WITH (FORMAT csv)', buffer)
+
+
+def insert(model, fields, rows, batch_size):
+    rows = iter(rows)
+    total = 0
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            return total
+        if connection.vendor == 'postgresql':
+            copy_rows(model, fields, chunk)
+        else:
+            model.objects.bulk_create(
+                model(**dict(zip(fields, row))) for row in chunk)
+        total += len(chunk)
+
+
+def prefixed(prefix):
+    prefix = re.escape(prefix)
+    return {
+        Tag: {'slug__regex': rf'^{prefix}_tag_\d+$'},
+        Ingredient: {'name__regex': rf'^{prefix} ingredient \d+$'},
+        User: {'username__regex': rf'^{prefix}_\d+$'},
+        Recipe: {'name__regex': rf'^{prefix} recipe \d+$'},
+    }
+
+
+def inserted_pks(model, **lookup):
+    return array('q', model.objects.filter(**lookup).order_by('pk')
+                 .values_list('pk', flat=True).iterator(chunk_size=10000))
+
+
+def tally(pairs, size):
+    counts = array('q', bytes(8 * size))
+    for _, target in pairs:
+        counts[target] += 1
+    return counts
+
+
+def generate(users=50, recipes=500, ingredients=300, tags=6, favorites=20,
+             carts=5, follows=5, ingredients_per_recipe=(3, 12), skew=1.0,
+             seed=0, prefix='synthetic', password='synthetic-password',
+             batch_size=1000, log=None):
+    log = log or (lambda message: None)
+    lookups = prefixed(prefix)
+    tags_per_recipe = (1, min(3, tags))
+    ingredients_per_recipe = (
+        min(ingredients_per_recipe[0], ingredients),
+        min(ingredients_per_recipe[1], ingredients),
+    )
+    now = timezone.now()
+
+    def stream(name):
+        return random.Random(f'{seed}:{name}')
+
+    rng = stream('popularity')
+    author_popularity = Popularity(users, skew, rng)
+    recipe_popularity = Popularity(recipes, skew, rng)
+    ingredient_popularity = Popularity(ingredients, skew, rng)
+
+    def recipe_plans():
+        rng = stream('recipes')
+        for _ in range(recipes):
+            yield (
+                rng.sample(range(tags), rng.randint(*tags_per_recipe)),
+                [
+                    (ingredient, rng.randint(1, 500))
+                    for ingredient in ingredient_popularity.sample(
+                        rng, rng.randint(*ingredients_per_recipe))
+                ],
+                rng.randint(1, 180),
+            )
+
+    def user_pairs(name, per_user, popularity, exclude_self=False):
+        rng = stream(name)
+        for user in range(users):
+            for target in popularity.sample(
+                    rng, per_user, user if exclude_self else None):
+                yield user, target
+
+    rng = stream('authors')
+    authors = array('q', (
+        author_popularity.pick(rng) for _ in range(recipes)))
+    recipes_count = tally(enumerate(authors), users)
+    followers_count = tally(
+        user_pairs('follows', follows, author_popularity, True), users)
+    favorites_count = tally(
+        user_pairs('favorites', favorites, recipe_popularity), recipes)
+    shopping_cart_count = tally(
+        user_pairs('carts', carts, recipe_popularity), recipes)
+
+    rng = stream('catalogue')
+    taken = set(Tag.objects.values_list('color', flat=True))
+    colors = []
+    while len(colors) < tags:
+        color = f'#{rng.randrange(16 ** 6):06X}'
+        if color not in taken:
+            taken.add(color)
+            colors.append(color)
+    tag_objects = [
+        Tag(name=f'{prefix} tag {number}', slug=f'{prefix}_tag_{number}',
+            color=colors[number])
+        for number in range(tags)
+    ]
+    Tag.objects.assign_bits(tag_objects)
+    Tag.objects.bulk_create(tag_objects)
+    tag_objects = list(Tag.objects.filter(**lookups[Tag]).order_by('pk'))
+
+    insert(Ingredient, ('name', 'measurement_unit'), (
+        (f'{prefix} ingredient {number}', rng.choice(MEASUREMENT_UNITS))
+        for number in range(ingredients)
+    ), batch_size)
+    ingredient_pks = inserted_pks(Ingredient, **lookups[Ingredient])
+    log(f'{len(tag_objects)} tags, {len(ingredient_pks)} ingredients')
+
+    password_hash = make_password(password)
+    insert(User, (
+        'email', 'username', 'first_name', 'last_name', 'password',
+        'is_superuser', 'is_staff', 'is_active', 'date_joined',
+        'recipes_count', 'followers_count',
+    ), (
+        (f'{prefix}_{number}@example.com', f'{prefix}_{number}', prefix,
+         str(number), password_hash, False, False, True, now,
+         recipes_count[number], followers_count[number])
+        for number in range(users)
+    ), batch_size)
+    user_pks = inserted_pks(User, **lookups[User])
+    log(f'{len(user_pks)} users')
+
+    start = now - timedelta(minutes=recipes)
+    with explicit_created():
+        insert(Recipe, (
+            'name', 'author_id', 'image', 'cooking_time', 'text', 'created',
+            'tags_mask', 'favorites_count', 'shopping_cart_count',
+        ), (
+            (f'{prefix} recipe {number}', user_pks[authors[number]],
+             f'recipes/{prefix}_{number}.png', cooking_time,
+             f'{prefix} recipe {number} text',
+             start + timedelta(minutes=number),
+             Tag.mask_of(tag_objects[tag] for tag in recipe_tags),
+             favorites_count[number], shopping_cart_count[number])
+            for number, (recipe_tags, _, cooking_time)
+            in enumerate(recipe_plans())
+        ), batch_size)
+    recipe_pks = inserted_pks(Recipe, **lookups[Recipe])
+    log(f'{len(recipe_pks)} recipes')
+
+    rows = insert(Recipe.tags.through, ('recipe_id', 'tag_id'), (
+        (recipe_pks[number], tag_objects[tag].pk)
+        for number, (recipe_tags, _, _) in enumerate(recipe_plans())
+        for tag in recipe_tags
+    ), batch_size)
+    log(f'{rows} recipe tags')
+    rows = insert(
+        RecipeIngredient, ('recipe_id', 'ingredient_id', 'amount'), (
+            (recipe_pks[number], ingredient_pks[ingredient], amount)
+            for number, (_, amounts, _) in enumerate(recipe_plans())
+            for ingredient, amount in amounts
+        ), batch_size)
+    log(f'{rows} recipe ingredients')
+
+    for model, name, per_user in (
+            (Favorite, 'favorites', favorites),
+            (ShoppingCart, 'carts', carts)):
+        rows = insert(model, ('user_id', 'recipe_id', 'created'), (
+            (user_pks[user], recipe_pks[recipe], now)
+            for user, recipe in user_pairs(
+                name, per_user, recipe_popularity)
+        ), batch_size)
+        log(f'{rows} {name}')
+    rows = insert(Follow, ('user_id', 'author_id', 'created'), (
+        (user_pks[user], user_pks[author], now)
+        for user, author in user_pairs(
+            'follows', follows, author_popularity, True)
+    ), batch_size)
+    log(f'{rows} follows')
+
+    for offset in range(0, len(user_pks), batch_size):
+        shopping_list.reconcile(list(user_pks[offset:offset + batch_size]))
+    log('shopping lists aggregated')
+
+    bump_on_commit('tags', 'ingredients', 'recipes',
+                   counts_version(Recipe), counts_version(User))
+    return Dataset(user_pks, recipe_pks, ingredient_pks, tag_objects,
+                   password)
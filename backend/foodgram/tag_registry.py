@@ -0,0 +1,19 @@
+from .models import Tag
+from .versions import Versioned
+
+
+class TagRegistry:
+    def __init__(self, tags, version):
+        self.tags = list(tags)
+        self.version = version
+        self.by_id = {tag.pk: tag for tag in self.tags}
+        self.by_slug = {tag.slug: tag for tag in self.tags}
+        self.representations = {}
+
+
+_registry = Versioned(
+    'tags', lambda version: TagRegistry(Tag.objects.all(), version))
+
+
+def get_tag_registry():
+    return _registry.get()
@@ -0,0 +1,56 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def version_key(name):
+    return f'version:{name}'
+
+
+def counts_version(model):
+    return f'counts:{model._meta.label_lower}'
+
+
+def now():
+    return int(time.time() * 1000)
+
+
+def get_version(name):
+    version = cache.get(version_key(name))
+    if version is None:
+        cache.add(version_key(name), now(), timeout=None)
+        version = cache.get(version_key(name))
+    return version
+
+
+def bump_version(name):
+    version = max(now(), get_version(name) + 1)
+    cache.set(version_key(name), version, timeout=None)
+    return version
+
+
+def bump_on_commit(*names):
+    def bump():
+        for name in names:
+            bump_version(name)
+    transaction.on_commit(bump)
+
+
+class Versioned:
+    def __init__(self, name, build):
+        self.name = name
+        self.build = build
+        self.lock = threading.Lock()
+        self.value = None
+        self.version = None
+
+    def get(self):
+        version = get_version(self.name)
+        if self.version != version:
+            with self.lock:
+                if self.version != version:
+                    self.value = self.build(version)
+                    self.version = version
+        return self.value
@@ -0,0 +1,65 @@
+import base64
+import io
+
+import pytest
+from django.core.cache import cache
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from foodgram import synthetic
+from user.models import User
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.RECIPE_IMAGE_RENDITION_WORKERS = 0
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def dataset(db):
+    return synthetic.generate(
+        users=8, recipes=40, ingredients=30, tags=4, favorites=6, carts=3,
+        follows=3, seed=1)
+
+
+@pytest.fixture
+def reader(dataset):
+    return User.objects.get(pk=dataset.users[0])
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def reader_client(reader):
+    client = APIClient()
+    token = Token.objects.create(user=reader)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+def encode_image(color, format, extension):
+    buffer = io.BytesIO()
+    Image.new('RGB', (40, 40), color).save(buffer, format)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/{extension};base64,{encoded}'
+
+
+@pytest.fixture
+def recipe_payload(dataset):
+    def build(color='red', format='PNG', extension='png', **fields):
+        return {
+            'name': f'{color} recipe', 'text': 'text', 'cooking_time': 5,
+            'image': encode_image(color, format, extension),
+            'tags': [dataset.tags[0].pk],
+            'ingredients': [{'id': dataset.ingredients[0], 'amount': 1}],
+            **fields,
+        }
+    return build
@@ -0,0 +1,38 @@
+import base64
+import io
+
+import pytest
+from PIL import Image
+from rest_framework import serializers
+
+from api.v1.serializers import BASE64_CHUNK_SIZE, decode_base64_image
+
+PREFIX = 'data:image/png;base64,'
+
+
+@pytest.fixture
+def png():
+    buffer = io.BytesIO()
+    Image.effect_noise((300, 300), 64).convert('RGB').save(buffer, 'PNG')
+    assert len(buffer.getvalue()) > 2 * BASE64_CHUNK_SIZE
+    return buffer.getvalue()
+
+
+def decode(encoded):
+    data = PREFIX + encoded
+    image = decode_base64_image(data, len(PREFIX), 'png')
+    try:
+        return image.read()
+    finally:
+        image.close()
+
+
+def test_decodes_mime_line_breaks(png):
+    assert decode(base64.encodebytes(png).decode()) == png
+    assert decode(base64.encodebytes(png).decode().replace(
+        '\n', '\r\n')) == png
+
+
+def test_rejects_truncated_payload(png):
+    with pytest.raises(serializers.ValidationError):
+        decode(base64.b64encode(png).decode()[:-1])
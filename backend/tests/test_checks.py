@@ -0,0 +1,17 @@
+import pytest
+from django.core.checks import Tags, run_checks
+
+
+@pytest.mark.parametrize('shared, workers, errors', (
+    (False, 1, []),
+    (False, 4, ['foodgram.E001']),
+    (True, 4, []),
+))
+def test_version_stamps_need_a_shared_cache(settings, shared, workers, errors):
+    settings.SHARED_CACHE = shared
+    settings.WEB_CONCURRENCY = workers
+    settings.RESPONSE_CACHE_TIMEOUT = 0
+    settings.MEMBERSHIP_CACHE_TIMEOUT = 0
+    assert [
+        error.id for error in run_checks(tags=[Tags.caches])
+    ] == errors
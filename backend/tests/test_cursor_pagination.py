@@ -0,0 +1,58 @@
+import base64
+import json
+
+import pytest
+
+from foodgram.models import Recipe
+
+
+@pytest.fixture
+def slug(dataset):
+    # Equal timestamps make the id tie-breaker decide the order.
+    slug = dataset.tags[0].slug
+    recipes = Recipe.objects.filter(tags__slug=slug).order_by('created')
+    Recipe.objects.filter(
+        pk__in=list(recipes.values_list('pk', flat=True)[:6])
+    ).update(created=recipes.first().created)
+    return slug
+
+
+def walk(api, url, link):
+    pages = []
+    while url:
+        response = api.get(url)
+        assert response.status_code == 200
+        data = response.json()
+        assert 'count' not in data
+        pages.append([recipe['id'] for recipe in data['results']])
+        url = data[link]
+    return pages
+
+
+def test_cursor_pages_follow_created_and_id(client, slug):
+    expected = list(
+        Recipe.objects.filter(tags__slug=slug)
+        .order_by('-created', '-id').values_list('pk', flat=True))
+    assert len(expected) > 8
+
+    pages = walk(client, f'/api/recipes/?tags={slug}&limit=4&cursor=', 'next')
+    assert [pk for page in pages for pk in page] == expected
+    assert all(len(page) == 4 for page in pages[:-1])
+
+    last = client.get(f'/api/recipes/?tags={slug}&limit=4&cursor=')
+    for _ in pages[1:]:
+        last = client.get(last.json()['next'])
+    backwards = walk(client, last.json()['previous'], 'previous')
+    assert backwards[::-1] == pages[:-1]
+
+
+@pytest.mark.parametrize('cursor', (
+    'not-a-cursor',
+    base64.urlsafe_b64encode(b'{"p": [1], "r": 0}').decode(),
+    base64.urlsafe_b64encode(
+        json.dumps({'p': ['yesterday', 1], 'r': 0}).encode()).decode(),
+))
+def test_invalid_cursor_returns_404(client, dataset, cursor):
+    response = client.get(f'/api/recipes/?cursor={cursor}')
+    assert response.status_code == 404
+    assert response.json() == {'detail': 'Неверный курсор.'}
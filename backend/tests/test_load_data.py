@@ -0,0 +1,51 @@
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+
+from foodgram.management.commands.load_data import read_json_array
+from foodgram.models import Ingredient, Tag
+
+INGREDIENTS = [
+    {'name': 'мука', 'measurement_unit': 'г'},
+    {'name': 'молоко', 'measurement_unit': 'мл'},
+    {'name': 'соль, поваренная', 'measurement_unit': 'щепотка'},
+]
+
+
+def load(*args):
+    out = io.StringIO()
+    call_command('load_data', *args, stdout=out)
+    return out.getvalue()
+
+
+def test_read_json_array_across_chunks():
+    text = json.dumps(INGREDIENTS, ensure_ascii=False, indent=2)
+    assert list(read_json_array(io.StringIO(text), chunk_size=7)) == (
+        INGREDIENTS)
+
+
+@pytest.mark.django_db
+def test_second_load_is_a_no_op(tmp_path):
+    path = tmp_path / 'ingredients.json'
+    path.write_text(
+        json.dumps(INGREDIENTS, ensure_ascii=False), encoding='utf-8')
+
+    assert '3 created, 0 updated' in load('ingredients', str(path))
+    rows = list(Ingredient.objects.values_list(
+        'pk', 'name', 'measurement_unit').order_by('pk'))
+    assert '0 created, 0 updated, 3 unchanged' in load(
+        'ingredients', str(path), '--batch-size', '2')
+    assert list(Ingredient.objects.values_list(
+        'pk', 'name', 'measurement_unit').order_by('pk')) == rows
+
+
+@pytest.mark.django_db
+def test_default_tags_file_loads_once():
+    load('tags')
+    tags = list(Tag.objects.values_list('slug', 'bit').order_by('slug'))
+    assert tags
+    assert '0 created, 0 updated' in load('tags')
+    assert list(
+        Tag.objects.values_list('slug', 'bit').order_by('slug')) == tags
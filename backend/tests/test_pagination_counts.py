@@ -0,0 +1,51 @@
+import pytest
+
+from user.models import User
+
+
+@pytest.fixture
+def uncached_responses(settings):
+    settings.RESPONSE_CACHE_TIMEOUT = 0
+
+
+def count(api, url):
+    response = api.get(url)
+    assert response.status_code == 200
+    return response.json()['count']
+
+
+@pytest.mark.parametrize('url', (
+    '/api/recipes/',
+    '/api/recipes/?tags={tag}',
+))
+def test_recipe_count_follows_creates_and_deletes(
+        transactional_db, uncached_responses, reader_client, client,
+        dataset, recipe_payload, url):
+    url = url.format(tag=dataset.tags[0].slug)
+    before = count(client, url)
+    assert count(client, url) == before
+
+    response = reader_client.post(
+        '/api/recipes/', recipe_payload(), format='json')
+    assert response.status_code == 201
+    assert count(client, url) == before + 1
+
+    response = reader_client.delete(f'/api/recipes/{response.json()["id"]}/')
+    assert response.status_code == 204
+    assert count(client, url) == before
+
+
+def test_user_count_follows_creates_and_deletes(
+        transactional_db, uncached_responses, client, dataset):
+    before = count(client, '/api/users/')
+
+    response = client.post('/api/users/', {
+        'email': 'new@example.com', 'username': 'new_user',
+        'first_name': 'New', 'last_name': 'User',
+        'password': 'Sup3r-secret-pass',
+    }, format='json')
+    assert response.status_code == 201
+    assert count(client, '/api/users/') == before + 1
+
+    User.objects.filter(pk=response.json()['id']).delete()
+    assert count(client, '/api/users/') == before
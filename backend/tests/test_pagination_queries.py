@@ -0,0 +1,57 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from foodgram import synthetic
+from foodgram.models import Follow
+
+PAGE_SIZES = (6, 60, 600)
+
+
+@pytest.fixture
+def dataset(db):
+    return synthetic.generate(
+        users=610, recipes=1300, ingredients=30, tags=4, favorites=2,
+        carts=1, follows=0, seed=2)
+
+
+@pytest.fixture
+def following(dataset, reader):
+    Follow.objects.bulk_create(
+        Follow(user=reader, author_id=author)
+        for author in dataset.users if author != reader.pk)
+
+
+def count_queries(api, url):
+    cache.clear()
+    with CaptureQueriesContext(connection) as queries:
+        response = api.get(url)
+    assert response.status_code == 200
+    return len(queries.captured_queries), response.json()
+
+
+@pytest.mark.parametrize('url', (
+    '/api/users/subscriptions/?recipes_limit=3&limit={}',
+    '/api/recipes/?limit={}',
+))
+def test_queries_do_not_grow_with_page_size(reader_client, following, url):
+    counts = set()
+    for size in PAGE_SIZES:
+        queries, data = count_queries(reader_client, url.format(size))
+        assert len(data['results']) == size
+        counts.add(queries)
+    assert len(counts) == 1
+
+
+@pytest.mark.parametrize('recipes_limit', (0, 1, 3))
+def test_recipes_limit_limits_nested_recipes(
+        reader_client, following, recipes_limit):
+    _, data = count_queries(
+        reader_client,
+        f'/api/users/subscriptions/?recipes_limit={recipes_limit}&limit=60')
+    for author in data['results']:
+        assert len(author['recipes']) == min(
+            recipes_limit, author['recipes_count'])
+    assert any(author['recipes_count'] > recipes_limit
+               for author in data['results'])
@@ -0,0 +1,46 @@
+import pytest
+
+from backend import middleware
+
+
+@pytest.fixture
+def profiles(settings, tmp_path):
+    settings.PROFILING_DIR = str(tmp_path / 'profiles')
+    settings.PROFILING_SECRET = 'profiling-secret'
+    settings.PROFILING_SAMPLE_RATE = 0
+    return tmp_path / 'profiles'
+
+
+def not_profiled():
+    raise AssertionError('profiler started')
+
+
+def written(profiles):
+    return sorted(path.suffix for path in profiles.glob('*'))
+
+
+@pytest.mark.parametrize('token', ('1', 'profiling-secre', 'wrong-secret'))
+def test_header_without_secret_is_ignored(
+        monkeypatch, reader_client, dataset, profiles, token):
+    monkeypatch.setattr(middleware.cProfile, 'Profile', not_profiled)
+    response = reader_client.get('/api/recipes/', HTTP_X_PROFILE=token)
+    assert response.status_code == 200
+    assert 'X-Profile-Id' not in response
+    assert written(profiles) == []
+
+
+def test_header_is_ignored_when_no_secret_is_set(
+        monkeypatch, settings, client, dataset, profiles):
+    monkeypatch.setattr(middleware.cProfile, 'Profile', not_profiled)
+    settings.PROFILING_SECRET = ''
+    response = client.get('/api/recipes/', HTTP_X_PROFILE='1')
+    assert 'X-Profile-Id' not in response
+    assert written(profiles) == []
+
+
+def test_header_with_secret_writes_a_profile(client, dataset, profiles):
+    response = client.get(
+        '/api/recipes/', HTTP_X_PROFILE='profiling-secret')
+    assert response.status_code == 200
+    assert written(profiles) == ['.json', '.prof']
+    assert (profiles / f'{response["X-Profile-Id"]}.prof').exists()
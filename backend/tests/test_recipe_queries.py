@@ -0,0 +1,25 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.mark.parametrize('authenticated, queries', ((False, 5), (True, 7)))
+def test_recipe_list_queries(
+        client, reader_client, dataset, django_assert_num_queries,
+        authenticated, queries):
+    api = reader_client if authenticated else client
+    with django_assert_num_queries(queries):
+        response = api.get('/api/recipes/')
+    assert response.status_code == 200
+    assert len(response.json()['results']) == 6
+
+
+@pytest.mark.parametrize('authenticated, queries', ((False, 4), (True, 6)))
+def test_recipe_detail_queries(
+        client, reader_client, dataset, django_assert_num_queries,
+        authenticated, queries):
+    api = reader_client if authenticated else client
+    for pk in dataset.recipes[:3]:
+        cache.clear()
+        with django_assert_num_queries(queries):
+            response = api.get(f'/api/recipes/{pk}/')
+        assert response.status_code == 200
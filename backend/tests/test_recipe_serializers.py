@@ -0,0 +1,74 @@
+import json
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.v1.serializers import FastReadRecipeSerializer, ReadRecipeSerializer
+from foodgram.models import Favorite, Follow, Recipe, ShoppingCart
+
+
+def render(serializer, queryset, user):
+    request = Request(APIRequestFactory().get('/api/recipes/'))
+    request.user = user
+    return JSONRenderer().render(
+        serializer(queryset, many=True, context={'request': request}).data)
+
+
+def render_both(user, **filters):
+    recipes = Recipe.objects.with_user_flags(user).filter(**filters)
+    expected = render(ReadRecipeSerializer, recipes.with_related(), user)
+    content = render(
+        FastReadRecipeSerializer,
+        recipes.values(*FastReadRecipeSerializer.fields), user)
+    assert content == expected
+    return json.loads(content)
+
+
+@pytest.mark.parametrize('authenticated', (False, True))
+def test_fast_serializer_renders_same_bytes(dataset, reader, authenticated):
+    Recipe.objects.filter(pk__in=dataset.recipes[::7]).update(image='')
+    user = reader if authenticated else AnonymousUser()
+    assert len(render_both(user)) == len(dataset.recipes)
+
+
+@pytest.mark.parametrize('authenticated', (False, True))
+def test_fast_serializer_without_image(dataset, reader, authenticated):
+    Recipe.objects.filter(pk=dataset.recipes[0]).update(image='')
+    user = reader if authenticated else AnonymousUser()
+    [recipe] = render_both(user, pk=dataset.recipes[0])
+    assert recipe['image'] is None
+    assert recipe['image_renditions'] is None
+
+
+def test_fast_serializer_flags_for_anonymous_reader(dataset):
+    recipes = render_both(AnonymousUser())
+    assert recipes
+    for recipe in recipes:
+        assert recipe['is_favorited'] is False
+        assert recipe['is_in_shopping_cart'] is False
+        assert recipe['author']['is_subscribed'] is False
+
+
+def test_fast_serializer_flags_for_authenticated_reader(dataset, reader):
+    favorites = set(Favorite.objects.filter(
+        user=reader).values_list('recipe_id', flat=True))
+    cart = set(ShoppingCart.objects.filter(
+        user=reader).values_list('recipe_id', flat=True))
+    assert favorites and cart
+    for recipe in render_both(reader):
+        assert recipe['is_favorited'] is (recipe['id'] in favorites)
+        assert recipe['is_in_shopping_cart'] is (recipe['id'] in cart)
+
+
+def test_fast_serializer_marks_subscribed_authors(dataset, reader):
+    followed = set(Follow.objects.filter(
+        user=reader).values_list('author_id', flat=True))
+    recipes = render_both(reader)
+    assert {recipe['author']['id'] for recipe in recipes} & followed
+    assert {recipe['author']['id'] for recipe in recipes} - followed
+    for recipe in recipes:
+        assert recipe['author']['is_subscribed'] is (
+            recipe['author']['id'] in followed)
@@ -0,0 +1,98 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from foodgram.models import Recipe
+
+
+@pytest.fixture
+def recipe(reader_client, recipe_payload):
+    response = reader_client.post(
+        '/api/recipes/', recipe_payload(), format='json')
+    assert response.status_code == 201
+    return Recipe.objects.get(pk=response.json()['id'])
+
+
+def amounts(recipe):
+    return dict(recipe.ingredients_for_recipe.values_list(
+        'ingredient_id', 'amount'))
+
+
+def ingredients(dataset, count, amount=1):
+    return [
+        {'id': pk, 'amount': amount + number}
+        for number, pk in enumerate(dataset.ingredients[:count])
+    ]
+
+
+@pytest.mark.parametrize('fields', (
+    ('name',),
+    ('name', 'ingredients'),
+    ('name', 'tags'),
+))
+def test_update_requires_ingredients_and_tags(
+        reader_client, recipe, recipe_payload, fields):
+    payload = recipe_payload(name='new name')
+    response = reader_client.patch(
+        f'/api/recipes/{recipe.pk}/',
+        {field: payload[field] for field in fields}, format='json')
+    assert response.status_code == 400
+    recipe.refresh_from_db()
+    assert recipe.name != 'new name'
+
+
+def test_ingredients_are_written_in_bulk(
+        reader_client, recipe, dataset, recipe_payload):
+    # The recipe fixture has already warmed the tag registry and memberships.
+    queries = set()
+    for count in (2, 20):
+        payload = recipe_payload(ingredients=ingredients(dataset, count))
+        with CaptureQueriesContext(connection) as captured:
+            response = reader_client.post(
+                '/api/recipes/', payload, format='json')
+        assert response.status_code == 201
+        queries.add(len(captured.captured_queries))
+        recipe = Recipe.objects.get(pk=response.json()['id'])
+        assert amounts(recipe) == {
+            ingredient['id']: ingredient['amount']
+            for ingredient in payload['ingredients']}
+    assert len(queries) == 1
+
+
+def test_update_replaces_ingredients(
+        reader_client, recipe, dataset, recipe_payload):
+    reader_client.patch(
+        f'/api/recipes/{recipe.pk}/',
+        recipe_payload(ingredients=ingredients(dataset, 10)), format='json')
+    kept = ingredients(dataset, 5, amount=100)
+    added = [{'id': pk, 'amount': 7} for pk in dataset.ingredients[20:25]]
+    response = reader_client.patch(
+        f'/api/recipes/{recipe.pk}/',
+        recipe_payload(ingredients=kept + added), format='json')
+    assert response.status_code == 200
+    assert amounts(recipe) == {
+        ingredient['id']: ingredient['amount']
+        for ingredient in kept + added}
+
+
+@pytest.mark.parametrize('unknown, message', (
+    ([10 ** 9], f'Ингредиент с id {10 ** 9} не существует'),
+    ([10 ** 9, 10 ** 9 + 1],
+     f'Ингредиенты с id {10 ** 9}, {10 ** 9 + 1} не существуют'),
+))
+def test_unknown_ingredients_are_rejected(
+        reader_client, dataset, recipe_payload, unknown, message):
+    payload = recipe_payload(ingredients=ingredients(dataset, 1) + [
+        {'id': pk, 'amount': 1} for pk in unknown])
+    response = reader_client.post('/api/recipes/', payload, format='json')
+    assert response.status_code == 400
+    assert message in str(response.json())
+    assert not Recipe.objects.filter(name=payload['name']).exists()
+
+
+def test_unknown_tags_are_rejected(reader_client, dataset, recipe_payload):
+    payload = recipe_payload(tags=[dataset.tags[0].pk, 10 ** 9])
+    response = reader_client.post('/api/recipes/', payload, format='json')
+    assert response.status_code == 400
+    assert 'tags' in response.json()
+    assert not Recipe.objects.filter(name=payload['name']).exists()
@@ -0,0 +1,31 @@
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from foodgram.models import Recipe
+from foodgram.renditions import rendition_name
+
+
+def test_recipes_get_separate_renditions(
+        reader_client, recipe_payload, django_capture_on_commit_callbacks):
+    recipes = []
+    for color, format, extension in (
+            ('red', 'PNG', 'png'), ('blue', 'JPEG', 'jpeg'),
+            ('green', 'PNG', 'png')):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = reader_client.post(
+                '/api/recipes/', recipe_payload(color, format, extension),
+                format='json')
+        assert response.status_code == 201
+        recipes.append(response.json())
+
+    urls = [recipe['image_renditions']['320']['webp'] for recipe in recipes]
+    assert len(set(urls)) == len(urls)
+
+    colors = []
+    for recipe in Recipe.objects.filter(
+            pk__in=[recipe['id'] for recipe in recipes]).order_by('pk'):
+        rendition = rendition_name(recipe.image.name, 320, 'jpeg')
+        with default_storage.open(rendition) as file, \
+                Image.open(file) as image:
+            colors.append(image.convert('RGB').getpixel((0, 0)))
+    assert len(set(colors)) == len(colors)
@@ -0,0 +1,23 @@
+from foodgram.models import Ingredient
+
+DOWNLOAD_URL = '/api/recipes/download_shopping_cart/'
+
+
+def test_download_etag_changes_when_ingredient_is_renamed(
+        reader_client, reader):
+    response = reader_client.get(DOWNLOAD_URL)
+    assert response.status_code == 200
+    etag = response['ETag']
+    assert reader_client.get(
+        DOWNLOAD_URL, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    ingredient = Ingredient.objects.get(
+        pk=reader.shopping_list.values_list('ingredient', flat=True)[0])
+    ingredient.name = f'{ingredient.name} renamed'
+    ingredient.measurement_unit = 'кг'
+    ingredient.save()
+
+    response = reader_client.get(DOWNLOAD_URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    assert 'renamed' in b''.join(response.streaming_content).decode()
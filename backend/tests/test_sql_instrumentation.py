@@ -0,0 +1,54 @@
+import pytest
+from django.http import JsonResponse
+from django.urls import include, path
+
+from backend.middleware import RepeatedQueryError
+from user.models import User
+
+
+def authors_one_by_one(request):
+    return JsonResponse({
+        'usernames': [
+            User.objects.get(pk=pk).username
+            for pk in User.objects.values_list('pk', flat=True)
+        ],
+    })
+
+
+urlpatterns = [
+    path('api/', include('api.v1.urls')),
+    path('authors/', authors_one_by_one),
+]
+
+
+@pytest.fixture
+def strict(settings):
+    settings.SQL_MAX_REPEATED_QUERIES = 1
+    settings.ROOT_URLCONF = __name__
+
+
+def test_strict_mode_rejects_repeated_queries(strict, client, dataset):
+    with pytest.raises(RepeatedQueryError):
+        client.get('/authors/')
+
+
+def test_strict_mode_allows_repeated_queries_up_to_the_limit(
+        settings, strict, client, dataset):
+    settings.SQL_MAX_REPEATED_QUERIES = len(dataset.users)
+    assert client.get('/authors/').status_code == 200
+
+
+@pytest.mark.parametrize('url', (
+    '/api/recipes/',
+    '/api/recipes/?is_favorited=1&is_in_shopping_cart=1',
+    '/api/recipes/{recipe}/',
+    '/api/tags/',
+    '/api/ingredients/?name=synthetic',
+    '/api/users/',
+    '/api/users/me/',
+    '/api/users/subscriptions/?recipes_limit=3',
+    '/api/recipes/download_shopping_cart/',
+))
+def test_endpoints_pass_strict_mode(strict, reader_client, dataset, url):
+    response = reader_client.get(url.format(recipe=dataset.recipes[0]))
+    assert response.status_code == 200
@@ -0,0 +1,48 @@
+import pytest
+
+from foodgram.models import Follow
+
+
+@pytest.fixture
+def following(dataset, reader):
+    Follow.objects.bulk_create((
+        Follow(user=reader, author_id=author)
+        for author in dataset.users if author != reader.pk
+    ), ignore_conflicts=True)
+
+
+@pytest.mark.parametrize('recipes_limit, status', (
+    ('abc', 400),
+    ('-1', 400),
+    ('', 200),
+    ('2', 200),
+))
+def test_recipes_limit_is_validated(
+        reader_client, following, recipes_limit, status):
+    response = reader_client.get(
+        f'/api/users/subscriptions/?recipes_limit={recipes_limit}')
+    assert response.status_code == status
+    if status == 400:
+        assert 'recipes_limit' in response.json()
+
+
+def test_empty_recipes_limit_returns_all_recipes(reader_client, following):
+    response = reader_client.get('/api/users/subscriptions/?recipes_limit=')
+    authors = response.json()['results']
+    assert any(author['recipes_count'] for author in authors)
+    for author in authors:
+        assert len(author['recipes']) == author['recipes_count']
+
+
+def test_nested_recipe_urls_are_absolute(reader_client, following):
+    response = reader_client.get('/api/users/subscriptions/?recipes_limit=1')
+    recipes = [
+        recipe for author in response.json()['results']
+        for recipe in author['recipes']
+    ]
+    assert recipes
+    for recipe in recipes:
+        assert recipe['image'].startswith('http://testserver/media/')
+        for urls in recipe['image_renditions'].values():
+            for url in urls.values():
+                assert url.startswith('http://testserver/media/')
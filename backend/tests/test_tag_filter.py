@@ -0,0 +1,53 @@
+import pytest
+
+from foodgram.models import Recipe
+
+
+def filtered_ids(api, slugs):
+    query = '&'.join(f'tags={slug}' for slug in slugs)
+    response = api.get(f'/api/recipes/?limit=100&{query}')
+    assert response.status_code == 200
+    return [recipe['id'] for recipe in response.json()['results']]
+
+
+def joined_ids(slugs):
+    return list(
+        Recipe.objects.filter(tags__slug__in=slugs).distinct()
+        .order_by('-created', '-id').values_list('pk', flat=True))
+
+
+@pytest.mark.parametrize('tags', ((0,), (1, 2), (0, 1, 2, 3)))
+def test_bitmask_filter_matches_join(client, dataset, tags):
+    slugs = [dataset.tags[tag].slug for tag in tags]
+    expected = joined_ids(slugs)
+    assert expected
+    assert filtered_ids(client, slugs) == expected
+
+
+def test_unknown_tag_is_rejected(client, dataset):
+    response = client.get(
+        f'/api/recipes/?tags={dataset.tags[0].slug}&tags=no-such-tag')
+    assert response.status_code == 400
+    assert 'tags' in response.json()
+
+
+def test_mask_follows_tag_edits(
+        client, reader_client, dataset, recipe_payload,
+        django_capture_on_commit_callbacks):
+    first, second = dataset.tags[0], dataset.tags[1]
+    with django_capture_on_commit_callbacks(execute=True):
+        response = reader_client.post(
+            '/api/recipes/', recipe_payload(tags=[first.pk]), format='json')
+    recipe_id = response.json()['id']
+    assert Recipe.objects.get(pk=recipe_id).tags_mask == first.mask
+    assert recipe_id in filtered_ids(client, [first.slug])
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = reader_client.patch(
+            f'/api/recipes/{recipe_id}/',
+            recipe_payload(tags=[second.pk]), format='json')
+    assert response.status_code == 200
+    assert Recipe.objects.get(pk=recipe_id).tags_mask == second.mask
+    assert recipe_id not in filtered_ids(client, [first.slug])
+    assert recipe_id in filtered_ids(client, [second.slug])
+    assert filtered_ids(client, [first.slug]) == joined_ids([first.slug])
@@ -9,6 +9,10 @@ class User(AbstractUser):
                               max_length=USERNAME_MAX_LENGTH)
     first_name = models.CharField("first_name", max_length=USERNAME_MAX_LENGTH)
     last_name = models.CharField("last_name", max_length=USERNAME_MAX_LENGTH)
+    recipes_count = models.PositiveIntegerField(
+        "recipes_count", default=0, editable=False)
+    followers_count = models.PositiveIntegerField(
+        "followers_count", default=0, editable=False)
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name', 'username']
 